@@ -0,0 +1,233 @@
+# backtest.py - Replay stored history through the analysts and score the results
+#
+# Work is split into (symbol, date range) partitions and run on a process
+# pool. Each partition loads its symbol's bars once (with warm-up history
+# before the range), computes every indicator series in one vectorized pass,
+# and walks the sessions in its range: the technical analyst sees the
+# indicators as of that close, the sentiment analyst sees the archived
+# headlines from the 24 hours before it. Predictions are resolved with the
+# scorekeeper's own next-session lookup. Partition results are merged in a
+# fixed (symbol, session, agent) order, so the outcome never depends on which
+# worker finished first.
+import argparse
+import bisect
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+from config import STOCK_SYMBOL
+import market_store
+import indicators
+import local_predictor
+import news_archive
+import headline_clustering
+import sentiment_lexicon
+import calibration
+import technical_analyst
+import sentiment_analyst
+from technical_analyst import parse_prediction
+from llm_client import MODEL, chat_completion
+import market_calendar
+from market_calendar import MARKET_TZ, MARKET_CLOSE
+from scorekeeper import load_sync_state, resolve_outcomes
+
+CHUNK_DAYS = 365                 # calendar days per partition
+HEADLINE_WINDOW = timedelta(hours=24)
+AGENTS = ("TechnicalAnalyst", "SentimentAnalyst")
+
+
+def partitions(symbols, start, end, chunk_days=CHUNK_DAYS):
+    """[(symbol, chunk_start, chunk_end)] covering start..end for every symbol"""
+    tasks = []
+    for symbol in symbols:
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+            tasks.append((symbol, chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+    return tasks
+
+
+def _close_time(day):
+    """Prediction timestamp for a session: just after that day's close (1 p.m. on early-close days)"""
+    hours = market_calendar.session(day)
+    close = hours[1] if hours else datetime.combine(day, MARKET_CLOSE, MARKET_TZ)
+    return close + timedelta(minutes=5)
+
+
+def _headline_index(start, end):
+    """Archived (publishedAt, title) pairs sorted by time, for the partition's range"""
+    since = (datetime.combine(start, MARKET_CLOSE, MARKET_TZ) - HEADLINE_WINDOW).astimezone(timezone.utc)
+    since = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+    articles = news_archive.load_articles(since=since)
+    pairs = sorted(
+        (datetime.fromisoformat(a["publishedAt"].replace("Z", "+00:00")), a["title"])
+        for a in articles if a.get("title")
+    )
+    return [p[0] for p in pairs], [p[1] for p in pairs]
+
+
+def _quiet_worker():
+    """Pool initializer: no per-session DEBUG or streamed-verdict chatter from replays"""
+    technical_analyst.DEBUG = False
+    technical_analyst.STREAM_MODE = "off"
+    sentiment_analyst.STREAM_MODE = "off"
+
+
+def _technical_verdict(market_data, values, mode):
+    response = local_predictor.predict(values, force=(mode == "local"))
+    if response is None and mode != "local":
+        response = technical_analyst.make_prediction(market_data, values)
+    return response
+
+
+def _sentiment_verdict(market_data, headlines, mode):
+    stories, counts = headline_clustering.collapse(headlines)
+    if mode == "local":
+        return sentiment_lexicon.local_verdict(stories)
+    relevant = sentiment_lexicon.rank_headlines(stories, sentiment_analyst.TOP_K_HEADLINES) or stories[:1]
+    completion = chat_completion(
+        model=MODEL,
+        messages=sentiment_analyst.build_messages(market_data, relevant, counts),
+        temperature=0.4,
+        max_tokens=120,
+    )
+    return completion.choices[0].message.content
+
+
+def run_partition(task):
+    """Predict and score every session of one (symbol, start, end, mode, agents, root) partition"""
+    symbol, start, end, mode, agents, root = task
+    bars = market_store.load_bars(symbol, end=end + timedelta(days=10), root=root)  # + next sessions to score against
+    dates = bars["date"]
+    if not len(dates):
+        return []
+    _, series = indicators.compute_series({symbol: bars})
+    # Score only against settled closes: the newest stored bar may be a provisional snapshot
+    final_through = load_sync_state(symbol, root).get("final_through")
+    settled = int(np.searchsorted(dates, np.datetime64(final_through, "D"), side="right")) if final_through else 0
+    index = {"date": dates[:settled], "close": np.asarray(bars["close"][:settled])}
+    lo = int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+    hi = int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+    if "SentimentAnalyst" in agents:
+        headline_times, headline_titles = _headline_index(start, end)
+
+    predictions = []
+    for col in range(lo, hi):
+        day = dates[col].astype(object)
+        made = _close_time(day)
+        close = float(bars["close"][col])
+        previous = float(bars["close"][col - 1]) if col else close
+        market_data = {
+            "symbol": symbol,
+            "price": f"{close:.2f}",
+            "change_percent": f"{(close - previous) / previous * 100:.4f}%" if previous else "0.0000%",
+            "timestamp": str(dates[col]),
+        }
+        verdicts = {}
+        if "TechnicalAnalyst" in agents:
+            values = indicators.series_values(series, 0, col, dates[col])
+            verdicts["TechnicalAnalyst"] = _technical_verdict(market_data, values, mode)
+        if "SentimentAnalyst" in agents:
+            first = bisect.bisect_right(headline_times, made - HEADLINE_WINDOW)
+            last = bisect.bisect_right(headline_times, made)
+            if last > first:
+                verdicts["SentimentAnalyst"] = _sentiment_verdict(market_data, headline_titles[first:last], mode)
+        for agent, response in verdicts.items():
+            parsed = parse_prediction(response) if response else {}
+            if {"prediction", "confidence"} <= parsed.keys():
+                predictions.append({
+                    "agent": agent,
+                    "prediction": parsed["prediction"],
+                    "confidence": parsed["confidence"],
+                    "reasoning": parsed.get("reasoning", ""),
+                    "timestamp": made.isoformat(),
+                    "symbol": symbol,
+                    "session": str(dates[col]),
+                })
+
+    results = []
+    for pred, outcome in zip(predictions, resolve_outcomes(index, predictions) if predictions else []):
+        if isinstance(outcome, dict):
+            results.append({**pred, "outcome": outcome["movement"], "outcome_session": outcome["session"],
+                            "correct": int(pred["prediction"] == outcome["movement"])})
+    return results
+
+
+def run_backtest(symbols, start=None, end=None, mode="local", agents=AGENTS, workers=None,
+                 chunk_days=CHUNK_DAYS, root=market_store.STORE_DIR):
+    """Replay every partition on a process pool; returns results in (symbol, session, agent) order"""
+    tasks = []
+    for symbol in symbols:
+        bars = market_store.load_bars(symbol, root=root)
+        if not len(bars["date"]):
+            print(f"⚠️  No stored bars for {symbol}")
+            continue
+        first = start or bars["date"][0].astype(object)
+        last = end or bars["date"][-1].astype(object)
+        tasks += [(s, a, b, mode, tuple(agents), root) for s, a, b in partitions([symbol], first, last, chunk_days)]
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1) or 1
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as pool:
+        for partition_results in pool.map(run_partition, tasks):
+            results.extend(partition_results)
+    results.sort(key=lambda r: (r["symbol"], r["session"], r["agent"]))
+    return results, len(tasks)
+
+
+def summarize(results):
+    """Per-agent accuracy plus the calibration report over the backtest results"""
+    agents = sorted({r["agent"] for r in results})
+    symbols = sorted({r["symbol"] for r in results})
+    confidences = sorted({r["confidence"] for r in results})
+    columns = {
+        "agent": np.array([agents.index(r["agent"]) for r in results], dtype=np.int32),
+        "symbol": np.array([symbols.index(r["symbol"]) for r in results], dtype=np.int32),
+        "confidence": np.array([confidences.index(r["confidence"]) for r in results], dtype=np.int32),
+        "correct": np.array([r["correct"] for r in results], dtype=np.int8),
+        "agents": agents,
+        "symbols": symbols,
+        "confidences": confidences,
+    }
+    return calibration.calibration_report(columns)
+
+
+def save_results(results, path):
+    fields = ["symbol", "session", "agent", "prediction", "confidence", "outcome", "outcome_session", "correct", "reasoning"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored bars and headlines through the analysts")
+    parser.add_argument("--symbols", nargs="+", default=[STOCK_SYMBOL])
+    parser.add_argument("--start", type=date.fromisoformat, help="First session (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last session (YYYY-MM-DD)")
+    parser.add_argument("--mode", choices=["local", "llm"], default="local",
+                        help="local: rule-based/lexicon only | llm: fall back to the (cached) LLM like live runs")
+    parser.add_argument("--agents", nargs="+", choices=AGENTS, default=list(AGENTS))
+    parser.add_argument("--workers", type=int, help="Processes (default: one per CPU)")
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS)
+    parser.add_argument("--output", help="Write every scored prediction to this CSV")
+    args = parser.parse_args()
+
+    print(f"🔁 Stock Oracle - Backtest ({args.mode} mode)")
+    print("=" * 60)
+    started = time.perf_counter()
+    results, partition_count = run_backtest(args.symbols, args.start, args.end, args.mode, args.agents,
+                                            args.workers, args.chunk_days)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {len(results)} prediction(s) over {partition_count} partition(s) in {elapsed:.2f}s\n")
+    if args.output:
+        save_results(results, args.output)
+        print(f"💾 Saved {args.output}\n")
+    print(calibration.format_report(summarize(results)))
+
+
+if __name__ == "__main__":
+    main()
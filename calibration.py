@@ -0,0 +1,104 @@
+# calibration.py - Does HIGH confidence actually mean more often right?
+#
+# Each CONFIDENCE label is mapped to the probability it claims that the
+# predicted direction is right. Over the whole outcome table (loaded as NumPy
+# columns) this gives hit rate per confidence bucket, Brier score, log-loss
+# and reliability curves (claimed vs observed per bucket) per agent and per
+# symbol - all with bincount over integer group codes, no Python loops over rows.
+import numpy as np
+import config
+import reputation_store
+
+CONFIDENCE_PROBABILITY = getattr(config, "CONFIDENCE_PROBABILITY", {"LOW": 0.55, "MEDIUM": 0.65, "HIGH": 0.8})
+BUCKETS = ["LOW", "MEDIUM", "HIGH"]
+EPSILON = 1e-6
+
+
+def _claimed(columns):
+    """Claimed probability per outcome row, and bucket index (-1 for unknown labels)"""
+    bucket_of = np.array([BUCKETS.index(c) if c in BUCKETS else -1 for c in columns["confidences"]] or [-1])
+    buckets = bucket_of[columns["confidence"]] if len(columns["confidence"]) else np.zeros(0, dtype=int)
+    table = np.array([CONFIDENCE_PROBABILITY[b] for b in BUCKETS] + [0.5])
+    return table[buckets], buckets
+
+
+def _group_stats(group, n_groups, claimed, buckets, correct):
+    """Per-group totals and per-(group, bucket) reliability points"""
+    y = correct.astype(float)
+    count = np.bincount(group, minlength=n_groups)
+    hits = np.bincount(group, weights=y, minlength=n_groups)
+    brier = np.bincount(group, weights=(claimed - y) ** 2, minlength=n_groups)
+    p = np.clip(claimed, EPSILON, 1 - EPSILON)
+    log_loss = np.bincount(group, weights=-(y * np.log(p) + (1 - y) * np.log(1 - p)), minlength=n_groups)
+
+    known = buckets >= 0
+    cell = group[known] * len(BUCKETS) + buckets[known]
+    cell_count = np.bincount(cell, minlength=n_groups * len(BUCKETS)).reshape(n_groups, len(BUCKETS))
+    cell_hits = np.bincount(cell, weights=y[known], minlength=n_groups * len(BUCKETS)).reshape(n_groups, len(BUCKETS))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "count": count,
+            "hit_rate": hits / count,
+            "brier": brier / count,
+            "log_loss": log_loss / count,
+            "bucket_count": cell_count,
+            "bucket_hit_rate": cell_hits / cell_count,
+        }
+
+
+def calibration_report(columns=None):
+    """{'overall', 'by_agent', 'by_symbol'} calibration tables over every scored outcome"""
+    columns = columns if columns is not None else reputation_store.outcome_columns()
+    claimed, buckets = _claimed(columns)
+    correct = columns["correct"]
+    report = {"claimed": {b: CONFIDENCE_PROBABILITY[b] for b in BUCKETS}, "rows": int(len(correct))}
+
+    def table(group, names):
+        stats = _group_stats(group, len(names), claimed, buckets, correct)
+        return {
+            name: {
+                "count": int(stats["count"][i]),
+                "hit_rate": float(stats["hit_rate"][i]),
+                "brier": float(stats["brier"][i]),
+                "log_loss": float(stats["log_loss"][i]),
+                "reliability": [
+                    (bucket, CONFIDENCE_PROBABILITY[bucket], float(stats["bucket_hit_rate"][i, j]),
+                     int(stats["bucket_count"][i, j]))
+                    for j, bucket in enumerate(BUCKETS)
+                ],
+            }
+            for i, name in enumerate(names)
+        }
+
+    report["overall"] = table(np.zeros(len(correct), dtype=np.int64), ["ALL"])["ALL"]
+    report["by_agent"] = table(columns["agent"], columns["agents"])
+    report["by_symbol"] = table(columns["symbol"], columns["symbols"])
+    return report
+
+
+def format_report(report):
+    def pct(value):
+        return "   -  " if np.isnan(value) else f"{value * 100:5.1f}%"
+
+    def block(name, stats):
+        lines = [f"{name}: {stats['count']} scored, hit rate {pct(stats['hit_rate'])}, "
+                 f"Brier {stats['brier']:.3f}, log-loss {stats['log_loss']:.3f}"]
+        for bucket, claimed, observed, count in stats["reliability"]:
+            if count:
+                gap = observed - claimed
+                lines.append(f"   {bucket:<6} claims {claimed * 100:4.0f}% → observed {pct(observed)} "
+                             f"({gap * 100:+.1f} pts, n={count})")
+        return "\n".join(lines)
+
+    if not report["rows"]:
+        return "📐 No scored predictions yet"
+    out = ["📐 CALIBRATION", "=" * 60, block("All agents", report["overall"]), "", "By agent:"]
+    out += [block(name, stats) for name, stats in report["by_agent"].items()]
+    out += ["", "By symbol:"]
+    out += [block(name, stats) for name, stats in report["by_symbol"].items()]
+    return "\n".join(out)
+
+
+if __name__ == "__main__":
+    print(format_report(calibration_report()))
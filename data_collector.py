@@ -1,41 +1,112 @@
 # data_collector.py - Fetches stock data (Day 1: Proving it works)
-import requests
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import config
 from config import ALPHA_VANTAGE_KEY, STOCK_SYMBOL
 from network_config import get_network_info
+from http_client import get_session, REQUEST_TIMEOUT
+from endpoints import ALPHA_VANTAGE_URL
+from market_store import append_bars, save_quote_change
+from rate_limiter import acquire, print_wait_stats
 
-def fetch_stock_price():
-    """Fetch current S&P 500 price from Alpha Vantage"""
-    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={STOCK_SYMBOL}&apikey={ALPHA_VANTAGE_KEY}"
+# Symbols to sweep each run (falls back to the single STOCK_SYMBOL)
+STOCK_SYMBOLS = getattr(config, "STOCK_SYMBOLS", [STOCK_SYMBOL])
+MAX_WORKERS = 16  # concurrent quote requests in flight
+
+def parse_global_quote(symbol, data):
+    """Turn a GLOBAL_QUOTE response into our market data dict"""
+    if "Global Quote" not in data or not data["Global Quote"]:
+        return None
+
+    quote = data["Global Quote"]
+    price = quote.get("05. price", "N/A")
+    change = quote.get("09. change", "N/A")
+    change_percent = quote.get("10. change percent", "N/A")
+
+    def number(key):
+        value = quote.get(key)
+        return float(value) if value not in (None, "", "N/A") else None
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "symbol": symbol,
+        "price": float(price) if price != "N/A" else None,
+        "change": change,
+        "change_percent": change_percent,
+        "raw_message": f"📊 {symbol} at ${price} ({change_percent})",
+        "trading_day": quote.get("07. latest trading day"),
+        "open": number("02. open"),
+        "high": number("03. high"),
+        "low": number("04. low"),
+        "volume": number("06. volume"),
+    }
+
+def fetch_stock_price(symbol=STOCK_SYMBOL, session=None):
+    """Fetch the current quote for one symbol from Alpha Vantage"""
+    session = session or get_session()
+    url = f"{ALPHA_VANTAGE_URL}?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_KEY}"
     
     try:
-        response = requests.get(url)
+        acquire("alphavantage")
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
         data = response.json()
         
-        if "Global Quote" in data:
-            quote = data["Global Quote"]
-            price = quote.get("05. price", "N/A")
-            change = quote.get("09. change", "N/A")
-            change_percent = quote.get("10. change percent", "N/A")
-            
-            market_data = {
-                "timestamp": datetime.now().isoformat(),
-                "symbol": STOCK_SYMBOL,
-                "price": float(price) if price != "N/A" else None,
-                "change": change,
-                "change_percent": change_percent,
-                "raw_message": f"📊 {STOCK_SYMBOL} at ${price} ({change_percent})"
-            }
-            
-            return market_data
-        else:
-            print(f"API Error: {data}")
-            return None
+        market_data = parse_global_quote(symbol, data)
+        if market_data is None:
+            print(f"API Error ({symbol}): {data}")
+        return market_data
             
     except Exception as e:
-        print(f"Error fetching data: {e}")
+        print(f"Error fetching data for {symbol}: {e}")
         return None
 
+def fetch_stock_prices(symbols=None, max_workers=MAX_WORKERS):
+    """Fetch quotes for many symbols concurrently over the shared session.
+
+    Returns one batch: {symbol: market_data or None}, in input order.
+    """
+    symbols = list(symbols or STOCK_SYMBOLS)
+    if not symbols:
+        return {}
+
+    session = get_session()
+    workers = max(1, min(max_workers, len(symbols)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda s: fetch_stock_price(s, session=session), symbols)
+        return dict(zip(symbols, results))
+
+def save_market_data(batch, path="latest_market_data.txt"):
+    """Write the snapshot file the analysts read (primary symbol first)"""
+    rows = [d for d in batch.values() if d]
+    rows.sort(key=lambda d: d["symbol"] != STOCK_SYMBOL)
+    if not rows:
+        return
+
+    with open(path, "w") as f:
+        f.write(f"{rows[0]['timestamp']}\n")
+        for d in rows:
+            f.write(f"{d['symbol']},{d['price']},{d['change_percent']}\n")
+
+def store_market_data(batch):
+    """Append each quote to the symbol's OHLCV history as its trading-day bar (plus its change percent)"""
+    stored = 0
+    for market_data in batch.values():
+        if not market_data or market_data["price"] is None or not market_data.get("trading_day"):
+            continue
+        price = market_data["price"]
+        bar = {
+            "date": market_data["trading_day"],
+            "open": market_data["open"] if market_data["open"] is not None else price,
+            "high": market_data["high"] if market_data["high"] is not None else price,
+            "low": market_data["low"] if market_data["low"] is not None else price,
+            "close": price,
+            "volume": market_data["volume"] or 0.0,
+        }
+        stored += append_bars(market_data["symbol"], [bar])
+        if market_data["change_percent"] != "N/A":
+            save_quote_change(market_data["symbol"], market_data["trading_day"], market_data["change_percent"])
+    return stored
+
 def run_data_collector():
     """Run the data collector"""
     print("🚀 Stock Oracle - Market Data Collector")
@@ -46,24 +117,28 @@ def run_data_collector():
     print(f"Agent: MarketDataCollector")
     print("\n📡 Fetching market data...\n")
     
-    # Fetch data
-    market_data = fetch_stock_price()
+    # Fetch all symbols in one concurrent sweep
+    started = datetime.now()
+    batch = fetch_stock_prices(STOCK_SYMBOLS)
+    elapsed = (datetime.now() - started).total_seconds()
+    fetched = [d for d in batch.values() if d]
     
-    if market_data:
-        print(f"✅ Data fetched successfully!")
-        print(f"   Symbol: {market_data['symbol']}")
-        print(f"   Price: ${market_data['price']}")
-        print(f"   Change: {market_data['change']} ({market_data['change_percent']})")
-        print(f"\n📤 Message: {market_data['raw_message']}")
+    if fetched:
+        print(f"✅ Fetched {len(fetched)}/{len(batch)} symbol(s) in {elapsed:.2f}s")
+        for market_data in fetched:
+            print(f"   {market_data['raw_message']}")
+        failed = [s for s, d in batch.items() if not d]
+        if failed:
+            print(f"⚠️  Failed: {', '.join(failed)}")
+        print_wait_stats()
         
-        # Save to file so other agents can read it
-        with open("latest_market_data.txt", "w") as f:
-            f.write(f"{market_data['timestamp']}\n")
-            f.write(f"{market_data['symbol']},{market_data['price']},{market_data['change_percent']}\n")
+        # Persist history for the analysts, plus the human-readable snapshot
+        stored = store_market_data(batch)
+        save_market_data(batch)
         
-        print("\n💾 Saved to latest_market_data.txt")
+        print(f"\n💾 Stored {stored} bar(s) in market_data/ and saved latest_market_data.txt")
         print("\n✅ DAY 1 COMPLETE: Data collector working!")
-        return market_data
+        return batch
     else:
         print("❌ Failed to fetch data")
         return None
@@ -1,10 +1,10 @@
 # data_collector_agent.py - OpenAgents WorkerAgent version
 from openagents.agents.worker_agent import WorkerAgent
 from openagents.models.event_context import EventContext
-import requests
-from datetime import datetime
-from config import ALPHA_VANTAGE_KEY, STOCK_SYMBOL
+from config import STOCK_SYMBOL
+from data_collector import fetch_stock_price, fetch_stock_prices, save_market_data, store_market_data, STOCK_SYMBOLS
 import asyncio
+import market_calendar
 
 class DataCollectorAgent(WorkerAgent):
     """Agent that fetches and broadcasts stock market data."""
@@ -27,16 +27,16 @@ class DataCollectorAgent(WorkerAgent):
     async def broadcast_market_data(self):
         """Fetch and broadcast market data to the network"""
         try:
-            # Fetch market data
-            market_data = self.fetch_stock_price()
+            # Fetch every tracked symbol in one concurrent sweep (off the event loop)
+            batch = await asyncio.to_thread(fetch_stock_prices, STOCK_SYMBOLS)
+            market_data = batch.get(STOCK_SYMBOL) or next((d for d in batch.values() if d), None)
             
             if market_data:
                 # Format message
-                message = f"""📊 **Market Data Update**
-Symbol: {market_data['symbol']}
-Price: ${market_data['price']}
-Change: {market_data['change']} ({market_data['change_percent']})
-Timestamp: {market_data['timestamp']}"""
+                message = "📊 **Market Data Update**\n" + "\n".join(
+                    f"{d['symbol']}: ${d['price']} ({d['change']}, {d['change_percent']})"
+                    for d in batch.values() if d
+                ) + f"\nTimestamp: {market_data['timestamp']}"
                 
                 # Send to market-data channel
                 # Try different ways to get messaging adapter
@@ -55,12 +55,11 @@ Timestamp: {market_data['timestamp']}"""
                 else:
                     print("❌ Messaging adapter not available")
                 
-                # Also save to file for backup
-                with open("latest_market_data.txt", "w") as f:
-                    f.write(f"{market_data['timestamp']}\n")
-                    f.write(f"{market_data['symbol']},{market_data['price']},{market_data['change_percent']}\n")
+                # Also persist history and the snapshot file for backup
+                store_market_data(batch)
+                save_market_data(batch)
                 
-                return market_data
+                return batch
             else:
                 print("❌ Failed to fetch market data")
                 return None
@@ -71,34 +70,9 @@ Timestamp: {market_data['timestamp']}"""
             traceback.print_exc()
             return None
     
-    def fetch_stock_price(self):
-        """Fetch current S&P 500 price from Alpha Vantage"""
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={STOCK_SYMBOL}&apikey={ALPHA_VANTAGE_KEY}"
-        
-        try:
-            response = requests.get(url)
-            data = response.json()
-            
-            if "Global Quote" in data:
-                quote = data["Global Quote"]
-                price = quote.get("05. price", "N/A")
-                change = quote.get("09. change", "N/A")
-                change_percent = quote.get("10. change percent", "N/A")
-                
-                return {
-                    "timestamp": datetime.now().isoformat(),
-                    "symbol": STOCK_SYMBOL,
-                    "price": float(price) if price != "N/A" else None,
-                    "change": change,
-                    "change_percent": change_percent
-                }
-            else:
-                print(f"API Error: {data}")
-                return None
-                
-        except Exception as e:
-            print(f"Error fetching data: {e}")
-            return None
+    def fetch_stock_price(self, symbol=STOCK_SYMBOL):
+        """Fetch the current quote for one symbol (shared pooled session)"""
+        return fetch_stock_price(symbol)
 
 async def main():
     """Run the market data collector agent."""
@@ -107,6 +81,7 @@ async def main():
     parser = argparse.ArgumentParser(description="Market Data Collector Agent")
     parser.add_argument("--host", default="localhost", help="Network host")
     parser.add_argument("--port", type=int, default=8700, help="Network port")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between broadcasts while the market is open")
     args = parser.parse_args()
     
     agent = DataCollectorAgent()
@@ -118,12 +93,15 @@ async def main():
             network_port=args.port,
         )
         
-        # Keep running
+        # Keep running: refresh quotes only during NYSE sessions, sleep through the rest
         print("\nAgent is running... Press Ctrl+C to stop.")
         while True:
-            await asyncio.sleep(60)  # Sleep for 60 seconds
-            # Optionally: fetch new data every minute
-            # await agent.broadcast_market_data()
+            delay = market_calendar.seconds_until_next_cycle(args.interval)
+            if not market_calendar.is_open():
+                print(f"💤 Market closed, next open {market_calendar.next_open():%Y-%m-%d %H:%M %Z}")
+            await asyncio.sleep(delay)
+            if market_calendar.is_open():
+                await agent.broadcast_market_data()
             
     except KeyboardInterrupt:
         print("\nShutting down...")
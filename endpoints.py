@@ -0,0 +1,17 @@
+# endpoints.py - Where every agent sends its API traffic
+#
+# Set STOCK_ORACLE_OFFLINE=http://127.0.0.1:8765 (or OFFLINE_URL in config.py)
+# to point the whole pipeline at replay_server.py instead of the live APIs.
+import os
+import config
+
+OFFLINE_URL = (os.environ.get("STOCK_ORACLE_OFFLINE") or getattr(config, "OFFLINE_URL", None) or "").rstrip("/") or None
+
+if OFFLINE_URL:
+    ALPHA_VANTAGE_URL = f"{OFFLINE_URL}/query"
+    NEWS_API_URL = f"{OFFLINE_URL}/v2/everything"
+    GROQ_BASE_URL = OFFLINE_URL
+else:
+    ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+    NEWS_API_URL = "https://newsapi.org/v2/everything"
+    GROQ_BASE_URL = None  # Groq SDK default (https://api.groq.com)
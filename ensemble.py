@@ -0,0 +1,131 @@
+# ensemble.py - Reputation-weighted network verdict ("EnsembleOracle")
+#
+# Each cycle's newest prediction per (agent, symbol) becomes a vote, and only
+# votes aimed at the session that has not opened yet are combined. An agent's expected
+# accuracy at the stated confidence comes from the precomputed aggregates
+# (shrunk toward the probability that confidence claims) and is blended with
+# its live EWMA reputation; the vote weight is the log-odds of that accuracy,
+# so coin-flip agents count for nothing. The combined verdict is appended to
+# the prediction log as EnsembleOracle and gets scored like any other agent.
+# Every lookup is a primary-key read, so a cycle costs the same however much
+# history has been scored.
+import json
+import math
+import os
+from datetime import datetime
+import config
+import prediction_log
+import reputation_store
+from calibration import CONFIDENCE_PROBABILITY
+from scorekeeper import earliest_session, read_new_predictions
+
+AGENT_NAME = "EnsembleOracle"
+STATE_FILE = "ensemble_state.json"
+PRIOR_STRENGTH = getattr(config, "ENSEMBLE_PRIOR_STRENGTH", 10)  # pseudo-outcomes behind the claimed probability
+HIGH_PROBABILITY = 0.7
+MEDIUM_PROBABILITY = 0.6
+
+
+def expected_accuracy(agent, symbol, confidence):
+    """Shrunk per-confidence accuracy, blended with the agent's live EWMA when available"""
+    prior = CONFIDENCE_PROBABILITY.get(confidence, 0.5)
+    correct, total = reputation_store.agent_record(agent, symbol, confidence)
+    accuracy = (correct + PRIOR_STRENGTH * prior) / (total + PRIOR_STRENGTH)
+    recent = reputation_store.recent_metrics(agent, symbol) or reputation_store.recent_metrics(agent)
+    if recent and recent["ewma"] is not None:
+        accuracy = (accuracy + recent["ewma"]) / 2
+    return min(max(accuracy, 0.01), 0.99)
+
+
+def vote_weight(accuracy):
+    """Log-odds weight; agents at or below chance get no say"""
+    return max(0.0, math.log(accuracy / (1 - accuracy)))
+
+
+def combine(predictions, symbol, now=None):
+    """Ensemble prediction dict for one symbol's latest votes, or None if nobody carries weight"""
+    score = 0.0
+    parts = []
+    for pred in predictions:
+        weight = vote_weight(expected_accuracy(pred["agent"], symbol, pred["confidence"]))
+        score += weight if pred["prediction"] == "UP" else -weight
+        parts.append(f"{pred['agent']} {pred['prediction']}/{pred['confidence']} w={weight:.2f}")
+    if score == 0:
+        return None
+
+    probability = 1 / (1 + math.exp(-abs(score)))
+    confidence = "HIGH" if probability >= HIGH_PROBABILITY else "MEDIUM" if probability >= MEDIUM_PROBABILITY else "LOW"
+    return {
+        "prediction": "UP" if score > 0 else "DOWN",
+        "confidence": confidence,
+        "reasoning": f"Reputation-weighted vote ({probability:.0%}): " + "; ".join(parts),
+        # Published now, so it targets the same upcoming session as its votes
+        "timestamp": (now or datetime.now()).isoformat(),
+    }
+
+
+def prediction_record(data, symbol):
+    return {"agent": AGENT_NAME, "symbol": symbol,
+            **{key: data[key] for key in ("prediction", "confidence", "reasoning", "timestamp")}}
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = None
+    if state is None or state.get("format") != prediction_log.FORMAT:
+        # Re-read the log from the start; votes for sessions already under way are dropped
+        state = {"offset": 0, "format": prediction_log.FORMAT}
+    return state
+
+
+def save_state(state, path=STATE_FILE):
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def run_ensemble():
+    """Combine the predictions saved since the last run; returns {symbol: ensemble prediction}"""
+    print("🤖 Stock Oracle - Ensemble Oracle")
+    print("=" * 60)
+    state = load_state()
+    now = datetime.now()
+    target = earliest_session(now.isoformat())
+    latest = {}
+    stale = 0
+    for pred in read_new_predictions(state):
+        if pred["agent"] == AGENT_NAME:
+            continue
+        # A vote whose session has already opened saw less than a verdict made
+        # now would, and its outcome may already be in the reputation weights
+        if earliest_session(pred["timestamp"]) != target:
+            stale += 1
+            continue
+        latest[(pred["symbol"], pred["agent"])] = pred  # newest wins
+    if stale:
+        print(f"   Skipped {stale} vote(s) for sessions that have already opened")
+
+    by_symbol = {}
+    for (symbol, _), pred in latest.items():
+        by_symbol.setdefault(symbol, []).append(pred)
+
+    verdicts = {}
+    for symbol in sorted(by_symbol):
+        verdict = combine(by_symbol[symbol], symbol, now)
+        if verdict is None:
+            print(f"   {symbol}: ⚖️  no agent carries weight yet, abstaining")
+            continue
+        verdicts[symbol] = verdict
+        print(f"   {symbol}: {verdict['prediction']} ({verdict['confidence']}) — {verdict['reasoning']}")
+
+    prediction_log.append([prediction_record(v, symbol) for symbol, v in verdicts.items()])
+    save_state(state)
+    print(f"\n✅ Published {len(verdicts)} ensemble prediction(s) for {target} at {now:%H:%M:%S}")
+    return verdicts
+
+
+if __name__ == "__main__":
+    run_ensemble()
@@ -0,0 +1,67 @@
+# headline_clustering.py - Collapse near-duplicate headlines (MinHash over title words)
+#
+# Outlets rewrite the same wire story many times ("Stocks rally as Fed holds"
+# / "Stocks rally after Fed holds rates - Reuters"). Each headline gets a
+# MinHash signature over its normalized content words; headlines whose
+# estimated Jaccard similarity clears the threshold are grouped, and each
+# group is reported once, by its most central member, with a count.
+import zlib
+import numpy as np
+from relevance_cache import normalize_title
+
+NUM_HASHES = 64
+THRESHOLD = 0.5   # estimated Jaccard similarity that makes two headlines one story
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "as", "at", "by",
+    "with", "after", "amid", "from", "is", "are", "its", "it", "this", "that", "be",
+}
+
+_PRIME = 4294967291  # largest prime below 2**32, so a * x + b never overflows uint64
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.uint64)
+
+
+def _words(headline):
+    words = [w for w in normalize_title(headline).split() if w not in STOPWORDS]
+    return words or [normalize_title(headline)]
+
+
+def signatures(headlines):
+    """(len(headlines) x NUM_HASHES) MinHash signature matrix"""
+    sigs = np.empty((len(headlines), NUM_HASHES), dtype=np.uint64)
+    for row, headline in enumerate(headlines):
+        tokens = np.array([zlib.crc32(w.encode()) % _PRIME for w in set(_words(headline))], dtype=np.uint64)
+        hashed = (_A[:, None] * tokens[None, :] + _B[:, None]) % _PRIME
+        sigs[row] = hashed.min(axis=1)
+    return sigs
+
+
+def similarity_matrix(headlines):
+    """Pairwise estimated Jaccard similarity between headlines"""
+    sigs = signatures(headlines)
+    return (sigs[:, None, :] == sigs[None, :, :]).mean(axis=2)
+
+
+def cluster_headlines(headlines, threshold=THRESHOLD):
+    """Group near-duplicates → [(representative, members)] in order of first appearance"""
+    if not headlines:
+        return []
+    sim = similarity_matrix(headlines)
+    unassigned = np.ones(len(headlines), dtype=bool)
+    clusters = []
+    for i in range(len(headlines)):
+        if not unassigned[i]:
+            continue
+        members = np.flatnonzero(unassigned & (sim[i] >= threshold))
+        unassigned[members] = False
+        # Most central member: highest mean similarity to the rest (ties → earliest)
+        centre = members[np.argmax(sim[np.ix_(members, members)].mean(axis=1))]
+        clusters.append((headlines[centre], [headlines[m] for m in members]))
+    return clusters
+
+
+def collapse(headlines, threshold=THRESHOLD):
+    """One representative per story plus {representative: number of outlets}"""
+    clusters = cluster_headlines(headlines, threshold)
+    return [rep for rep, _ in clusters], {rep: len(members) for rep, members in clusters}
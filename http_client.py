@@ -0,0 +1,24 @@
+# http_client.py - Shared keep-alive HTTP session for every API caller
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+REQUEST_TIMEOUT = 10   # seconds, applied to every outbound request
+POOL_SIZE = 32         # max keep-alive connections per host
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled requests session (created on first use)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
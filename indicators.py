@@ -0,0 +1,408 @@
+# indicators.py - Vectorized technical indicators over the OHLCV store
+#
+# Batch pass: every symbol's history is stacked into one (symbols x bars)
+# matrix (left-padded with NaN) and SMA/EMA/RSI/MACD/Bollinger/ATR/volume
+# z-scores are computed column-wise for all symbols at once.
+#
+# Incremental pass: the end state of the batch pass (EMA values, Wilder
+# averages, the last few closes/volumes) is saved per symbol, and each new
+# bar is folded in with O(1) work instead of recomputing the whole series.
+# The state only ever covers settled bars: the newest stored bar may still be
+# an intraday snapshot, so it is applied to a throwaway copy.
+import copy
+import json
+import os
+from collections import deque
+import numpy as np
+import market_store
+
+SMA_FAST = 20
+SMA_SLOW = 50
+EMA_FAST = 12
+EMA_SLOW = 26
+MACD_SIGNAL = 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLLINGER_K = 2.0
+VOLUME_WINDOW = 20
+WINDOW = max(SMA_SLOW, SMA_FAST, VOLUME_WINDOW)  # closes kept in the incremental state
+
+
+# -------------------------------------------------------------------
+# Vectorized kernels (operate on the last axis of 2-D arrays)
+# -------------------------------------------------------------------
+def _rolling_sum(x, n):
+    """Rolling sum over the last axis; NaN until n valid values are in the window"""
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=-1)
+    ccount = np.cumsum(valid, axis=-1)
+    pad = np.zeros(x.shape[:-1] + (1,))
+    csum = np.concatenate([pad, csum], axis=-1)
+    ccount = np.concatenate([pad, ccount], axis=-1)
+    total = csum[..., n:] - csum[..., :-n]
+    count = ccount[..., n:] - ccount[..., :-n]
+    out = np.full(x.shape, np.nan)
+    out[..., n - 1:] = np.where(count == n, total, np.nan)
+    return out
+
+
+def sma(x, n):
+    """Simple moving average"""
+    return _rolling_sum(x, n) / n
+
+
+def rolling_std(x, n):
+    """Population standard deviation over a rolling window"""
+    mean = sma(x, n)
+    var = _rolling_sum(x * x, n) / n - mean * mean
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def ewm(x, alpha):
+    """Exponential smoothing seeded with each row's first valid value"""
+    out = np.full(x.shape, np.nan)
+    state = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        col = x[..., t]
+        stepped = np.where(np.isnan(state), col, state + alpha * (col - state))
+        state = np.where(np.isnan(col), state, stepped)
+        out[..., t] = state
+    return out
+
+
+def ema(x, n):
+    """Exponential moving average with the usual 2 / (n + 1) smoothing"""
+    return ewm(x, 2.0 / (n + 1))
+
+
+def _diff(x):
+    """First difference along the last axis (NaN for the first column)"""
+    out = np.full(x.shape, np.nan)
+    out[..., 1:] = x[..., 1:] - x[..., :-1]
+    return out
+
+
+def rsi(close, n=RSI_PERIOD):
+    """Wilder RSI; returns (rsi, avg_gain, avg_loss)"""
+    delta = _diff(close)
+    avg_gain = ewm(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)), 1.0 / n)
+    avg_loss = ewm(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0)), 1.0 / n)
+    return _rsi_from_averages(avg_gain, avg_loss), avg_gain, avg_loss
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + rs))
+
+
+def true_range(high, low, close):
+    """True range; the first bar falls back to high - low"""
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[..., 1:] = close[..., :-1]
+    gap = np.fmax(np.abs(high - prev_close), np.abs(low - prev_close))
+    return np.fmax(high - low, gap)
+
+
+# -------------------------------------------------------------------
+# Batch computation for many symbols
+# -------------------------------------------------------------------
+def _stack(series_list):
+    """Left-pad 1-D arrays with NaN into one (len(series_list) x max_len) matrix"""
+    width = max((len(s) for s in series_list), default=0)
+    out = np.full((len(series_list), width), np.nan)
+    for i, series in enumerate(series_list):
+        if len(series):
+            out[i, width - len(series):] = series
+    return out
+
+
+def compute_series(bars_by_symbol):
+    """Full indicator series for many symbols in one vectorized pass.
+
+    bars_by_symbol: {symbol: {column: 1-D array}}. Returns (symbols, series)
+    where every series entry is a (symbols x bars) matrix, right-aligned so
+    the last column is each symbol's newest bar.
+    """
+    symbols = list(bars_by_symbol)
+    close, high, low, volume = (
+        _stack([np.asarray(bars_by_symbol[s][c], dtype=float) for s in symbols])
+        for c in ("close", "high", "low", "volume")
+    )
+
+    ema_fast = ema(close, EMA_FAST)
+    ema_slow = ema(close, EMA_SLOW)
+    macd = ema_fast - ema_slow
+    macd_signal = ema(macd, MACD_SIGNAL)
+    rsi_values, avg_gain, avg_loss = rsi(close)
+    atr = ewm(true_range(high, low, close), 1.0 / ATR_PERIOD)
+    sma_fast = sma(close, SMA_FAST)
+    band = BOLLINGER_K * rolling_std(close, SMA_FAST)
+    volume_std = rolling_std(volume, VOLUME_WINDOW)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_b = np.where(band > 0, (close - (sma_fast - band)) / (2 * band), 0.5)
+        volume_z = np.where(volume_std > 0, (volume - sma(volume, VOLUME_WINDOW)) / volume_std, 0.0)
+
+    series = {
+        "close": close,
+        "high": high,
+        "low": low,
+        "volume": volume,
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "macd_hist": macd - macd_signal,
+        "rsi": np.where(np.isnan(avg_loss), np.nan, rsi_values),
+        "avg_gain": avg_gain,
+        "avg_loss": avg_loss,
+        "atr": atr,
+        "sma_fast": sma_fast,
+        "sma_slow": sma(close, SMA_SLOW),
+        "bollinger_upper": sma_fast + band,
+        "bollinger_lower": sma_fast - band,
+        "bollinger_percent_b": np.where(np.isnan(sma_fast), np.nan, percent_b),
+        "volume_z": np.where(np.isnan(volume_std), np.nan, volume_z),
+    }
+    return symbols, series
+
+
+def compute_batch(bars_by_symbol):
+    """Run every indicator over many symbols' bars in one vectorized pass.
+
+    Returns {symbol: (latest indicator values, incremental state)}.
+    """
+    symbols, series = compute_series(bars_by_symbol)
+    results = {}
+    for i, symbol in enumerate(symbols):
+        n = len(bars_by_symbol[symbol]["close"])
+        if n == 0:
+            continue
+        dates = bars_by_symbol[symbol]["date"]
+        state = {
+            "date": str(np.datetime64(dates[-1], "D")),
+            "count": n,
+            "prev_close": float(series["close"][i, -1]),
+            "ema_fast": float(series["ema_fast"][i, -1]),
+            "ema_slow": float(series["ema_slow"][i, -1]),
+            "macd_signal": float(series["macd_signal"][i, -1]),
+            "avg_gain": _float_or_none(series["avg_gain"][i, -1]),
+            "avg_loss": _float_or_none(series["avg_loss"][i, -1]),
+            "atr": float(series["atr"][i, -1]),
+            "closes": series["close"][i, -min(n, WINDOW):].tolist(),
+            "volumes": series["volume"][i, -min(n, VOLUME_WINDOW):].tolist(),
+        }
+        results[symbol] = (indicator_values(state), state)
+    return results
+
+
+def _float_or_none(value):
+    return None if np.isnan(value) else float(value)
+
+
+def series_values(series, row, col, date=None):
+    """Indicator readings at one bar of compute_series output (same keys as indicator_values)"""
+    def at(name):
+        return _float_or_none(series[name][row, col])
+
+    price = at("close")
+    values = {name: at(name) for name in (
+        "ema_fast", "ema_slow", "macd", "macd_signal", "macd_hist", "atr", "sma_fast", "sma_slow",
+        "bollinger_upper", "bollinger_lower", "bollinger_percent_b", "rsi", "volume_z",
+    )}
+    values["price"] = price
+    values["bars"] = int(np.count_nonzero(~np.isnan(series["close"][row, :col + 1])))
+    values["date"] = None if date is None else str(np.datetime64(date, "D"))
+    values["atr_percent"] = values["atr"] / price * 100 if price and values["atr"] is not None else None
+    return values
+
+
+# -------------------------------------------------------------------
+# Incremental state
+# -------------------------------------------------------------------
+def _ewm_step(state, alpha, value):
+    return value if state is None else state + alpha * (value - state)
+
+
+def apply_bar(state, bar):
+    """Fold one new bar into an indicator state in O(1); returns the same dict"""
+    close = float(bar["close"])
+    high = float(bar["high"])
+    low = float(bar["low"])
+    prev_close = state["prev_close"]
+
+    state["ema_fast"] = _ewm_step(state["ema_fast"], 2.0 / (EMA_FAST + 1), close)
+    state["ema_slow"] = _ewm_step(state["ema_slow"], 2.0 / (EMA_SLOW + 1), close)
+    macd = state["ema_fast"] - state["ema_slow"]
+    state["macd_signal"] = _ewm_step(state["macd_signal"], 2.0 / (MACD_SIGNAL + 1), macd)
+
+    delta = close - prev_close
+    state["avg_gain"] = _ewm_step(state["avg_gain"], 1.0 / RSI_PERIOD, max(delta, 0.0))
+    state["avg_loss"] = _ewm_step(state["avg_loss"], 1.0 / RSI_PERIOD, max(-delta, 0.0))
+
+    tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+    state["atr"] = _ewm_step(state["atr"], 1.0 / ATR_PERIOD, tr)
+
+    closes = deque(state["closes"], maxlen=WINDOW)
+    closes.append(close)
+    volumes = deque(state["volumes"], maxlen=VOLUME_WINDOW)
+    volumes.append(float(bar["volume"]))
+    state["closes"] = list(closes)
+    state["volumes"] = list(volumes)
+
+    state["prev_close"] = close
+    state["count"] += 1
+    state["date"] = str(np.datetime64(bar["date"], "D"))
+    return state
+
+
+def indicator_values(state):
+    """Latest indicator readings from a state (constant work: fixed windows)"""
+    closes = np.asarray(state["closes"])
+    volumes = np.asarray(state["volumes"])
+    price = state["prev_close"]
+    values = {
+        "price": price,
+        "bars": state["count"],
+        "date": state["date"],
+        "ema_fast": state["ema_fast"],
+        "ema_slow": state["ema_slow"],
+        "macd": state["ema_fast"] - state["ema_slow"],
+        "macd_signal": state["macd_signal"],
+        "atr": state["atr"],
+        "atr_percent": state["atr"] / price * 100 if price else None,
+        "sma_fast": None,
+        "sma_slow": None,
+        "bollinger_upper": None,
+        "bollinger_lower": None,
+        "bollinger_percent_b": None,
+        "rsi": None,
+        "volume_z": None,
+    }
+    values["macd_hist"] = values["macd"] - values["macd_signal"]
+
+    if state["avg_gain"] is not None and state["avg_loss"] is not None:
+        values["rsi"] = float(_rsi_from_averages(np.float64(state["avg_gain"]), np.float64(state["avg_loss"])))
+    if len(closes) >= SMA_FAST:
+        window = closes[-SMA_FAST:]
+        mid, std = window.mean(), window.std()
+        values["sma_fast"] = float(mid)
+        values["bollinger_upper"] = float(mid + BOLLINGER_K * std)
+        values["bollinger_lower"] = float(mid - BOLLINGER_K * std)
+        width = values["bollinger_upper"] - values["bollinger_lower"]
+        values["bollinger_percent_b"] = float((price - values["bollinger_lower"]) / width) if width else 0.5
+    if len(closes) >= SMA_SLOW:
+        values["sma_slow"] = float(closes[-SMA_SLOW:].mean())
+    if len(volumes) >= VOLUME_WINDOW:
+        std = volumes.std()
+        values["volume_z"] = float((volumes[-1] - volumes.mean()) / std) if std else 0.0
+    return values
+
+
+def _state_path(symbol, root):
+    return os.path.join(root, symbol.upper(), "indicators.json")
+
+
+def load_state(symbol, root=market_store.STORE_DIR):
+    try:
+        with open(_state_path(symbol, root), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(symbol, state, root=market_store.STORE_DIR):
+    path = _state_path(symbol, root)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _same_tail(state, bars, index):
+    """Whether the closes/volumes folded into a state still match the store up to `index`.
+
+    Catches a provisional collector bar replaced by the settled bar for the
+    same date, which leaves the date and bar count unchanged.
+    """
+    closes = np.asarray(bars["close"][index + 1 - len(state["closes"]):index + 1], dtype=float)
+    volumes = np.asarray(bars["volume"][index + 1 - len(state["volumes"]):index + 1], dtype=float)
+    return np.array_equal(closes, state["closes"]) and np.array_equal(volumes, state["volumes"])
+
+
+def update_indicators(symbols, root=market_store.STORE_DIR):
+    """Latest indicator values for many symbols, updating saved states incrementally.
+
+    Symbols without a saved state (or whose history was rewritten, including
+    a provisional bar replaced in place) are computed together in one batched
+    vectorized pass; the rest only fold in the bars that arrived since their
+    last run.
+    """
+    results = {}
+    cold = {}
+    for symbol in symbols:
+        count = market_store.bar_count(symbol, root)
+        if count == 0:
+            continue
+        bars = market_store.load_bars(symbol, root=root)
+        settled_end = count - 1  # newest bar may be provisional
+        state = load_state(symbol, root)
+
+        if state is not None:
+            state_day = np.datetime64(state["date"], "D")
+            state_index = int(np.searchsorted(bars["date"], state_day))
+            in_sync = (
+                state_index < settled_end
+                and bars["date"][state_index] == state_day
+                and state["count"] == state_index + 1
+                and _same_tail(state, bars, state_index)
+            )
+            if not in_sync:
+                state = None
+
+        if state is None:
+            cold[symbol] = bars
+            continue
+
+        for i in range(state["count"], settled_end):
+            apply_bar(state, {c: bars[c][i] for c in market_store.COLUMNS})
+        save_state(symbol, state, root)
+        results[symbol] = _with_latest(state, bars)
+
+    if cold:
+        settled = {s: {c: b[c][:-1] for c in market_store.COLUMNS} for s, b in cold.items()}
+        for symbol, (_, state) in compute_batch(settled).items():
+            save_state(symbol, state, root)
+            results[symbol] = _with_latest(state, cold[symbol])
+        for symbol, bars in cold.items():
+            if symbol not in results:  # only one (provisional) bar stored so far
+                _, state = compute_batch({symbol: {c: bars[c][:1] for c in market_store.COLUMNS}})[symbol]
+                results[symbol] = indicator_values(state)
+
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+
+def _with_latest(state, bars):
+    """Indicator values with the newest (possibly provisional) bar applied to a copy"""
+    latest = {c: bars[c][-1] for c in market_store.COLUMNS}
+    return indicator_values(apply_bar(copy.deepcopy(state), latest))
+
+
+def _fmt(value, spec=".2f"):
+    return "n/a" if value is None else format(value, spec)
+
+
+def format_indicators(values):
+    """Render indicator values as prompt lines"""
+    trend = "n/a"
+    if values["sma_fast"] is not None and values["sma_slow"] is not None:
+        trend = "above" if values["sma_fast"] > values["sma_slow"] else "below"
+    return "\n".join([
+        f"- History: {values['bars']} daily bars through {values['date']}",
+        f"- SMA{SMA_FAST}: {_fmt(values['sma_fast'])} | SMA{SMA_SLOW}: {_fmt(values['sma_slow'])} (fast is {trend} slow)",
+        f"- EMA{EMA_FAST}: {_fmt(values['ema_fast'])} | EMA{EMA_SLOW}: {_fmt(values['ema_slow'])}",
+        f"- RSI{RSI_PERIOD}: {_fmt(values['rsi'], '.1f')}",
+        f"- MACD: {_fmt(values['macd'], '.3f')} | Signal: {_fmt(values['macd_signal'], '.3f')} | Histogram: {_fmt(values['macd_hist'], '.3f')}",
+        f"- Bollinger({SMA_FAST}, {BOLLINGER_K:g}): {_fmt(values['bollinger_lower'])} - {_fmt(values['bollinger_upper'])} (%B {_fmt(values['bollinger_percent_b'])})",
+        f"- ATR{ATR_PERIOD}: {_fmt(values['atr'])} ({_fmt(values['atr_percent'])}% of price)",
+        f"- Volume z-score ({VOLUME_WINDOW}d): {_fmt(values['volume_z'])}",
+    ])
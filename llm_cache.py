@@ -0,0 +1,132 @@
+# llm_cache.py - Content-addressed, disk-backed cache for chat completions
+#
+# The key is a SHA-256 of the full request (model, messages, temperature,
+# tools, tool_choice, max_tokens, ...), so rerunning an analyst on the same
+# snapshot returns the stored completion without calling Groq. Entries expire
+# after LLM_CACHE_TTL seconds and the least recently used ones are evicted
+# once the cache grows past LLM_CACHE_MAX_BYTES.
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+import config
+
+CACHE_FILE = getattr(config, "LLM_CACHE_FILE", "llm_cache.db")
+TTL = getattr(config, "LLM_CACHE_TTL", 6 * 3600)                 # seconds; 0 disables the cache
+MAX_BYTES = getattr(config, "LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _connect(path=CACHE_FILE):
+    """One sqlite connection per thread"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_accessed ON completions (accessed_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        _local.conn = conn
+    return conn
+
+
+def cache_key(request):
+    """Stable hash of a chat-completions request"""
+    payload = {k: v for k, v in request.items() if k != "stream"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _to_json(completion):
+    if hasattr(completion, "model_dump_json"):
+        return completion.model_dump_json()
+    return json.dumps(completion, default=lambda o: vars(o))
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+    conn = _connect()
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, amount),
+    )
+    conn.commit()
+
+
+def get(request):
+    """Cached completion for a request (attribute access like the SDK object), or None"""
+    if not TTL:
+        return None
+    key = cache_key(request)
+    conn = _connect()
+    now = time.time()
+    row = conn.execute("SELECT value, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+    if row is None or now - row[1] > TTL:
+        if row is not None:
+            conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            conn.commit()
+        _count("misses")
+        return None
+    conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+    conn.commit()
+    _count("hits")
+    return json.loads(row[0], object_hook=lambda d: SimpleNamespace(**d))
+
+
+def put(request, completion):
+    """Store a completion and evict least-recently-used entries over the size bound"""
+    if not TTL:
+        return
+    value = _to_json(completion)
+    now = time.time()
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO completions (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+        (cache_key(request), value, len(value), now, now),
+    )
+    conn.execute("DELETE FROM completions WHERE created_at < ?", (now - TTL,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+    evicted = 0
+    if total > MAX_BYTES:
+        for key, size in conn.execute("SELECT key, size FROM completions ORDER BY accessed_at").fetchall():
+            if total <= MAX_BYTES:
+                break
+            conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+    conn.commit()
+    if evicted:
+        _count("evictions", evicted)
+
+
+def cache_stats():
+    """Hit/miss/eviction counters for this process and across all runs"""
+    rows = dict(_connect().execute("SELECT name, value FROM counters").fetchall())
+    entries, size = _connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+    with _stats_lock:
+        session = dict(_stats)
+    lookups = session["hits"] + session["misses"]
+    return {
+        "session": {**session, "hit_rate": session["hits"] / lookups if lookups else 0.0},
+        "lifetime": {name: rows.get(name, 0) for name in ("hits", "misses", "evictions")},
+        "entries": entries,
+        "bytes": size,
+    }
+
+
+def cache_report():
+    """One-line summary of cache effectiveness"""
+    stats = cache_stats()
+    session = stats["session"]
+    return (f"🗄️  LLM cache: {session['hits']} hit(s), {session['misses']} miss(es) "
+            f"({session['hit_rate']:.0%} hit rate), {stats['entries']} entries / {stats['bytes'] / 1024:.0f} KiB")
@@ -0,0 +1,83 @@
+# llm_client.py - Long-lived Groq clients shared by every analyst
+#
+# One sync client per process and one async client per event loop, so every
+# chat completion reuses pooled keep-alive connections instead of paying a
+# new TLS handshake. Every call is looked up in the response cache first and
+# only goes through the rate limiter to Groq on a miss.
+import asyncio
+import threading
+import weakref
+from groq import Groq, AsyncGroq
+import config
+from config import GROQ_API_KEY
+from endpoints import GROQ_BASE_URL
+from rate_limiter import acquire, acquire_async
+import llm_cache
+
+MODEL = "llama-3.3-70b-versatile"
+MAX_IN_FLIGHT = getattr(config, "LLM_MAX_IN_FLIGHT", 8)  # concurrent requests per batch
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncGroq
+
+
+def get_client():
+    """Process-wide Groq client (created on first use)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+    return _client
+
+
+def get_async_client():
+    """AsyncGroq client for the running event loop (its connections are loop-bound)"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+        _async_clients[loop] = client
+    return client
+
+
+def chat_completion(cache=True, **kwargs):
+    """chat.completions.create on the shared client (cached, rate limited)"""
+    if cache:
+        cached = llm_cache.get(kwargs)
+        if cached is not None:
+            return cached
+    acquire("groq")
+    completion = get_client().chat.completions.create(**kwargs)
+    if cache:
+        llm_cache.put(kwargs, completion)
+    return completion
+
+
+async def chat_completion_async(cache=True, **kwargs):
+    """Async chat.completions.create on the loop's shared client (cached, rate limited).
+
+    Cache reads and writes are sqlite I/O, so they run on a worker thread
+    instead of stalling every other coroutine on the loop.
+    """
+    if cache:
+        cached = await asyncio.to_thread(llm_cache.get, kwargs)
+        if cached is not None:
+            return cached
+    await acquire_async("groq")
+    completion = await get_async_client().chat.completions.create(**kwargs)
+    if cache:
+        await asyncio.to_thread(llm_cache.put, kwargs, completion)
+    return completion
+
+
+async def gather_limited(coroutines, limit=MAX_IN_FLIGHT):
+    """Await coroutines concurrently with at most `limit` in flight; keeps input order"""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines), return_exceptions=True)
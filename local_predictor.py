@@ -0,0 +1,127 @@
+# local_predictor.py - Rule-based fast path that skips the LLM when signals agree
+#
+# Each indicator casts a vote in [-1, 1] (positive = UP). When the weighted
+# score is strong and most votes point the same way, the verdict is emitted
+# locally in the same PREDICTION/CONFIDENCE/REASONING format the LLM uses.
+# Otherwise the caller falls back to the LLM.
+import json
+import math
+import os
+
+DECISIVE_SCORE = 0.45     # |weighted score| needed to skip the LLM
+DECISIVE_AGREEMENT = 0.75 # share of non-neutral votes that must agree
+HIGH_SCORE = 0.7          # |score| for a HIGH confidence verdict
+STATS_FILE = "fast_path_stats.json"
+
+WEIGHTS = {
+    "trend": 1.0,
+    "price_vs_sma": 0.75,
+    "macd": 1.0,
+    "rsi": 0.75,
+    "bollinger": 0.5,
+}
+
+
+def _clamp(value):
+    return max(-1.0, min(1.0, value))
+
+
+def signal_votes(values):
+    """Per-indicator votes in [-1, 1]; indicators without enough history are skipped"""
+    votes = {}
+    price = values["price"]
+    atr = values.get("atr") or 0.0
+
+    if values.get("sma_fast") is not None and values.get("sma_slow") is not None and atr:
+        votes["trend"] = _clamp((values["sma_fast"] - values["sma_slow"]) / atr)
+    if values.get("sma_fast") is not None and atr:
+        votes["price_vs_sma"] = _clamp((price - values["sma_fast"]) / atr)
+    if values.get("macd_hist") is not None and atr:
+        votes["macd"] = math.tanh(values["macd_hist"] / (0.1 * atr))
+    rsi = values.get("rsi")
+    if rsi is not None:
+        if rsi >= 70:
+            votes["rsi"] = -_clamp((rsi - 70) / 15)    # overbought: mean reversion
+        elif rsi <= 30:
+            votes["rsi"] = _clamp((30 - rsi) / 15)     # oversold
+        else:
+            votes["rsi"] = _clamp((rsi - 50) / 20)     # momentum
+    percent_b = values.get("bollinger_percent_b")
+    if percent_b is not None:
+        if percent_b > 1:
+            votes["bollinger"] = -_clamp(percent_b - 1 + 0.5)
+        elif percent_b < 0:
+            votes["bollinger"] = _clamp(-percent_b + 0.5)
+        else:
+            votes["bollinger"] = 0.0
+    return votes
+
+
+def score_signals(values):
+    """Weighted score in [-1, 1] and the share of non-neutral votes that agree with it"""
+    votes = signal_votes(values)
+    if not votes:
+        return 0.0, 0.0, votes
+    total_weight = sum(WEIGHTS[name] for name in votes)
+    score = sum(WEIGHTS[name] * vote for name, vote in votes.items()) / total_weight
+    decided = [vote for vote in votes.values() if abs(vote) >= 0.1]
+    agreeing = [vote for vote in decided if (vote > 0) == (score > 0)]
+    agreement = len(agreeing) / len(decided) if decided else 0.0
+    return score, agreement, votes
+
+
+def predict(values, force=False):
+    """Local verdict text, or None when the signals conflict (unless force=True) or point nowhere"""
+    if not values:
+        return None
+    score, agreement, votes = score_signals(values)
+    if not votes or score == 0:
+        return None  # nothing voted: even a forced call would be an arbitrary DOWN
+    decisive = abs(score) >= DECISIVE_SCORE and agreement >= DECISIVE_AGREEMENT
+    if not decisive and not force:
+        return None
+
+    direction = "UP" if score > 0 else "DOWN"
+    if decisive:
+        confidence = "HIGH" if abs(score) >= HIGH_SCORE else "MEDIUM"
+    else:
+        confidence = "LOW"
+    strongest = sorted(votes, key=lambda name: abs(votes[name]), reverse=True)[:2]
+    drivers = ", ".join(f"{name} {votes[name]:+.2f}" for name in strongest) or "no signals"
+    return (
+        f"PREDICTION: {direction}\n"
+        f"CONFIDENCE: {confidence}\n"
+        f"REASONING: Rule-based score {score:+.2f} with {agreement:.0%} of signals agreeing (strongest: {drivers})."
+    )
+
+
+def load_stats(path=STATS_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"local": 0, "llm": 0}
+
+
+def record_counts(local=0, llm=0, path=STATS_FILE):
+    """Add served-locally / served-by-LLM counts; returns the totals"""
+    stats = load_stats(path)
+    stats["local"] += local
+    stats["llm"] += llm
+    with open(path + ".tmp", "w") as f:
+        json.dump(stats, f)
+    os.replace(path + ".tmp", path)
+    return stats
+
+
+def record_decision(used_local, path=STATS_FILE):
+    """Count one prediction as served locally or by the LLM; returns the totals"""
+    return record_counts(local=int(used_local), llm=int(not used_local), path=path)
+
+
+def fast_path_report(stats=None):
+    """One-line summary of how many LLM calls the fast path avoided"""
+    stats = stats or load_stats()
+    total = stats["local"] + stats["llm"]
+    share = stats["local"] / total if total else 0.0
+    return f"⚡ Fast path: {stats['local']}/{total} prediction(s) served locally ({share:.0%} of LLM calls avoided)"
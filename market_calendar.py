@@ -0,0 +1,163 @@
+# market_calendar.py - Local NYSE session calendar (holidays, early closes)
+#
+# Rule-based, no network: the ten NYSE holidays with their weekend
+# observance rules, Good Friday via the Gregorian Easter computation, the
+# 1 p.m. early closes (July 3rd, the day after Thanksgiving, Christmas Eve)
+# and one-off closures. Used to skip API calls on days with no session and to
+# tell the scheduler when the next open or the next settled close will be.
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Unscheduled full-day closures (national days of mourning, etc.)
+SPECIAL_CLOSURES = {
+    date(2012, 10, 29), date(2012, 10, 30),  # Hurricane Sandy
+    date(2018, 12, 5),                       # President George H. W. Bush
+    date(2025, 1, 9),                        # President Jimmy Carter
+}
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based) weekday of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """Full-day NYSE closures in a year"""
+    days = {
+        _nth_weekday(year, 2, 0, 3),   # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),   # Independence Day
+        _nth_weekday(year, 9, 0, 1),   # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)), # Christmas
+    }
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:        # a Saturday New Year's Day is not made up on Dec 31
+        days.add(_observed(new_year))
+    if year >= 1998:
+        days.add(_nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    days.update(d for d in SPECIAL_CLOSURES if d.year == year)
+    return frozenset(days)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """Sessions that close at 1 p.m."""
+    days = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}  # day after Thanksgiving
+    for candidate in (date(year, 7, 3), date(year, 12, 24)):
+        if candidate.weekday() < 4:  # Mon-Thu; on a Friday it is the observed holiday itself
+            days.add(candidate)
+    return frozenset(days - holidays(year))
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session(day):
+    """(open, close) as aware datetimes, or None when there is no session"""
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else MARKET_CLOSE
+    return (datetime.combine(day, MARKET_OPEN, MARKET_TZ), datetime.combine(day, close, MARKET_TZ))
+
+
+def next_trading_day(day):
+    """First trading day strictly after `day`"""
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def previous_trading_day(day):
+    """Last trading day strictly before `day`"""
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def _now(now):
+    return (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+
+
+def latest_close(now=None):
+    """Date of the most recent session whose close has already happened"""
+    now = _now(now)
+    hours = session(now.date())
+    if hours and now >= hours[1]:
+        return now.date()
+    return previous_trading_day(now.date())
+
+
+def is_open(now=None):
+    now = _now(now)
+    hours = session(now.date())
+    return bool(hours) and hours[0] <= now < hours[1]
+
+
+def next_open(now=None):
+    """Aware datetime of the next session open after `now`"""
+    now = _now(now)
+    hours = session(now.date())
+    if hours and now < hours[0]:
+        return hours[0]
+    return session(next_trading_day(now.date()))[0]
+
+
+def first_open_after(moment):
+    """Date of the first session that opens at or after an aware or naive (machine-local) datetime"""
+    moment = moment.astimezone(MARKET_TZ)
+    hours = session(moment.date())
+    if hours and moment <= hours[0]:
+        return moment.date()
+    return next_trading_day(moment.date())
+
+
+def seconds_until_next_cycle(interval, now=None):
+    """How long a poller should sleep: `interval` while the market is open,
+    otherwise until the next open (or until today's close if that comes first)"""
+    now = _now(now)
+    hours = session(now.date())
+    if hours and hours[0] <= now < hours[1]:
+        return min(interval, (hours[1] - now).total_seconds() + 1)
+    return max(1.0, (next_open(now) - now).total_seconds())
@@ -0,0 +1,217 @@
+# market_store.py - Append-only columnar OHLCV store (NumPy + memory-mapped files)
+#
+# Layout: market_data/<SYMBOL>/<column>.bin, one little-endian 8-byte value per bar.
+# Dates are int64 days since 1970-01-01 and are strictly increasing, so a date
+# range is two binary searches. Reads return read-only memmap views, so years
+# of history never get copied into Python objects. The latest quote's own
+# change percent sits next to the columns in quote.json.
+import json
+import os
+from datetime import date, datetime
+import numpy as np
+import market_calendar
+
+STORE_DIR = "market_data"
+
+COLUMNS = ("date", "open", "high", "low", "close", "volume")
+DTYPES = {
+    "date": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+
+def _symbol_dir(symbol, root):
+    return os.path.join(root, symbol.upper())
+
+
+def _column_path(symbol, column, root):
+    return os.path.join(_symbol_dir(symbol, root), f"{column}.bin")
+
+
+def _quote_path(symbol, root):
+    return os.path.join(_symbol_dir(symbol, root), "quote.json")
+
+
+def to_day(value):
+    """Convert 'YYYY-MM-DD' / date / datetime / datetime64 into int64 epoch days"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        value = value.isoformat()
+    return int(np.datetime64(value, "D").astype("<i8"))
+
+
+def day_to_str(day):
+    """Convert int64 epoch days back into 'YYYY-MM-DD'"""
+    return str(np.datetime64(int(day), "D"))
+
+
+def bar_count(symbol, root=STORE_DIR):
+    """Number of complete bars stored for a symbol"""
+    sizes = []
+    for column in COLUMNS:
+        path = _column_path(symbol, column, root)
+        if not os.path.exists(path):
+            return 0
+        sizes.append(os.path.getsize(path) // DTYPES[column].itemsize)
+    # A crash mid-append can leave some columns one row longer; the
+    # shortest column is the committed length
+    return min(sizes)
+
+
+def _open_column(symbol, column, count, root):
+    """Read-only memmap of the first `count` values of a column"""
+    dtype = DTYPES[column]
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(_column_path(symbol, column, root), dtype=dtype, mode="r", shape=(count,))
+
+
+def _truncate_columns(symbol, count, root):
+    """Cut every column file back to exactly `count` rows"""
+    for column in COLUMNS:
+        path = _column_path(symbol, column, root)
+        size = count * DTYPES[column].itemsize
+        if os.path.getsize(path) != size:
+            os.truncate(path, size)
+
+
+def last_date(symbol, root=STORE_DIR):
+    """Most recent stored date as 'YYYY-MM-DD', or None for an empty store"""
+    count = bar_count(symbol, root)
+    if count == 0:
+        return None
+    return day_to_str(_open_column(symbol, "date", count, root)[-1])
+
+
+def append_bars(symbol, bars, root=STORE_DIR):
+    """Append bars (dicts with date/open/high/low/close/volume) for a symbol.
+
+    Bars older than the last stored date are ignored; a bar for the last
+    stored date replaces it (so an intraday snapshot can be finalized).
+    Returns the number of rows appended or replaced.
+    """
+    os.makedirs(_symbol_dir(symbol, root), exist_ok=True)
+    for column in COLUMNS:
+        open(_column_path(symbol, column, root), "ab").close()
+
+    count = bar_count(symbol, root)
+    _truncate_columns(symbol, count, root)
+    last = int(_open_column(symbol, "date", count, root)[-1]) if count else None
+
+    rows = sorted(
+        ({**bar, "date": to_day(bar["date"])} for bar in bars),
+        key=lambda bar: bar["date"],
+    )
+    replace = None
+    new_rows = []
+    for bar in rows:
+        if last is not None and bar["date"] < last:
+            continue
+        if last is not None and bar["date"] == last:
+            replace = bar
+            continue
+        if new_rows and new_rows[-1]["date"] == bar["date"]:
+            new_rows[-1] = bar
+            continue
+        new_rows.append(bar)
+
+    if replace is not None:
+        for column in COLUMNS:
+            dtype = DTYPES[column]
+            with open(_column_path(symbol, column, root), "r+b") as f:
+                f.seek((count - 1) * dtype.itemsize)
+                f.write(np.asarray([replace[column]], dtype=dtype).tobytes())
+
+    if new_rows:
+        # Write the date column last: it is what makes a row visible
+        for column in COLUMNS[1:] + COLUMNS[:1]:
+            values = np.asarray([bar[column] for bar in new_rows], dtype=DTYPES[column])
+            with open(_column_path(symbol, column, root), "ab") as f:
+                f.write(values.tobytes())
+
+    return len(new_rows) + (replace is not None)
+
+
+def truncate_after(symbol, keep_through, root=STORE_DIR):
+    """Drop every bar dated after `keep_through` (None drops everything)"""
+    count = bar_count(symbol, root)
+    if count == 0:
+        return 0
+    if keep_through is None:
+        keep = 0
+    else:
+        dates = _open_column(symbol, "date", count, root)
+        keep = int(np.searchsorted(dates, to_day(keep_through), side="right"))
+    _truncate_columns(symbol, keep, root)
+    return count - keep
+
+
+def load_bars(symbol, start=None, end=None, root=STORE_DIR):
+    """Return {column: array} for bars with start <= date <= end (inclusive).
+
+    Arrays are read-only memmap views; `date` is exposed as datetime64[D].
+    """
+    count = bar_count(symbol, root)
+    dates = _open_column(symbol, "date", count, root)
+    lo = int(np.searchsorted(dates, to_day(start), side="left")) if start is not None else 0
+    hi = int(np.searchsorted(dates, to_day(end), side="right")) if end is not None else count
+
+    bars = {column: _open_column(symbol, column, count, root)[lo:hi] for column in COLUMNS}
+    bars["date"] = bars["date"].view("datetime64[D]")
+    return bars
+
+
+def save_quote_change(symbol, day, change_percent, root=STORE_DIR):
+    """Remember the quote's own change percent for the bar dated `day`"""
+    os.makedirs(_symbol_dir(symbol, root), exist_ok=True)
+    path = _quote_path(symbol, root)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"date": str(day), "change_percent": change_percent}, f)
+    os.replace(path + ".tmp", path)
+
+
+def _quote_change(symbol, day, root):
+    try:
+        with open(_quote_path(symbol, root), "r") as f:
+            quote = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return quote.get("change_percent") if quote.get("date") == day else None
+
+
+def read_market_data(symbol, root=STORE_DIR):
+    """Latest close and day-over-day change for a symbol, in the analysts' format.
+
+    The change is the quote's own when it was saved for the latest bar;
+    otherwise it is computed from stored closes, but only when the bar before
+    is the previous trading session (a skipped day would skew it).
+    """
+    count = bar_count(symbol, root)
+    if count == 0:
+        return None
+
+    closes = _open_column(symbol, "close", count, root)
+    dates = _open_column(symbol, "date", count, root)
+    price = float(closes[-1])
+    day = day_to_str(dates[-1])
+    change_percent = _quote_change(symbol, day, root)
+    if change_percent is None:
+        previous = market_calendar.previous_trading_day(date.fromisoformat(day))
+        if count >= 2 and closes[-2] and int(dates[-2]) == to_day(previous):
+            change_percent = f"{(price - closes[-2]) / closes[-2] * 100:.4f}%"
+        else:
+            change_percent = "N/A"
+
+    return {
+        "symbol": symbol.upper(),
+        "price": price,
+        "change_percent": change_percent,
+        "timestamp": day,
+    }
@@ -0,0 +1,287 @@
+# news_archive.py - Incremental NewsAPI ingestion into a compressed local archive
+#
+# Each poll first asks NewsAPI for the newest page of articles published since
+# the cursor, a persisted publishedAt watermark, so analysts always see the
+# latest headlines. Pages come newest-first: when more was published than that
+# page holds, the cursor still moves to its newest article and the unfetched
+# older part is remembered as a gap. The rest of the poll's page budget fills
+# gaps, newest first, fetching each gap's pages concurrently over the shared
+# session; gaps older than NewsAPI's history window are given up. New
+# articles are appended to monthly gzip files (news_archive/YYYY-MM.jsonl.gz,
+# one gzip member per poll) and indexed by URL and normalized-title hash in
+# news_archive/index.db, so syndicated copies are stored once and analysts
+# read headlines from local disk.
+import gzip
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import config
+from config import NEWS_API_KEY
+from endpoints import NEWS_API_URL
+from http_client import get_session, REQUEST_TIMEOUT
+from rate_limiter import acquire
+from relevance_cache import title_hash
+
+ARCHIVE_DIR = getattr(config, "NEWS_ARCHIVE_DIR", "news_archive")
+NEWS_QUERY = "market OR stocks OR economy OR Wall Street OR SPY OR S&P 500"
+PAGE_SIZE = 100                                        # NewsAPI maximum
+MAX_PAGES = getattr(config, "NEWS_MAX_PAGES", 5)      # per poll; each page costs one request
+LOOKBACK_HOURS = getattr(config, "NEWS_LOOKBACK_HOURS", 24)  # first poll only
+GAP_MAX_DAYS = getattr(config, "NEWS_GAP_MAX_DAYS", 30)      # older gaps are beyond NewsAPI's history
+TITLE_WINDOW_HOURS = getattr(config, "NEWS_TITLE_DEDUP_HOURS", 12)  # same headline within ± this = same story
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def _connect(root=ARCHIVE_DIR):
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(root, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(root, "index.db"), timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " url_hash TEXT PRIMARY KEY, title_hash TEXT NOT NULL, title TEXT NOT NULL,"
+            " source TEXT, published_at TEXT NOT NULL, archive TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_title ON articles (title_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        _local.conn = conn
+    return conn
+
+
+def url_hash(url):
+    return hashlib.sha1(url.strip().encode()).hexdigest()
+
+
+def cursor():
+    """{'cursor', 'gaps'}: everything up to `cursor` is archived except the
+    [from, to] publishedAt ranges listed in `gaps`"""
+    conn = _connect()
+    state = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('cursor', 'gaps', 'until', 'top')").fetchall())
+    if "until" in state:
+        # Single-gap state written by earlier versions
+        return {"cursor": state.get("top") or state["until"], "gaps": [[state["cursor"], state["until"]]]}
+    if "cursor" not in state:
+        # Archives from before the persisted cursor: resume after the newest article
+        state["cursor"] = conn.execute("SELECT MAX(published_at) FROM articles").fetchone()[0]
+    return {"cursor": state["cursor"], "gaps": json.loads(state.get("gaps") or "[]")}
+
+
+def save_cursor(state):
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM meta WHERE key IN ('cursor', 'gaps', 'until', 'top')")
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [("cursor", state["cursor"]), ("gaps", json.dumps(state["gaps"]))],
+        )
+
+
+def _fetch_page(page, since, session, until=None):
+    """One /everything page → (articles, totalResults)"""
+    acquire("newsapi")
+    r = session.get(
+        NEWS_API_URL,
+        params={
+            "q": NEWS_QUERY,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "pageSize": PAGE_SIZE,
+            "page": page,
+            "from": since.replace("Z", ""),
+            **({"to": until.replace("Z", "")} if until else {}),
+            "apiKey": NEWS_API_KEY,
+        },
+        timeout=REQUEST_TIMEOUT,
+    )
+    data = r.json()
+    if data.get("status") != "ok":
+        raise RuntimeError(data.get("message") or f"HTTP {r.status_code}")
+    return data.get("articles", []), data.get("totalResults", 0)
+
+
+def _fetch_range(since, until, budget, session):
+    """Up to `budget` newest-first pages of since..until (until=None: up to now).
+
+    Returns (articles, prefix, pages, done): `prefix` is the newest-first run of
+    articles fetched without a hole, `done` whether the whole range was fetched.
+    The first page's errors propagate; later pages are fetched concurrently.
+    """
+    articles, total = _fetch_page(1, since, session, until)
+    needed = math.ceil(total / PAGE_SIZE)
+    pages = min(budget, needed)
+    prefix = articles
+    broken = False
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=pages - 1) as pool:
+            futures = [pool.submit(_fetch_page, page, since, session, until) for page in range(2, pages + 1)]
+            for future in futures:
+                try:
+                    page_articles = future.result()[0]
+                except Exception as e:
+                    print(f"⚠️ NewsAPI page error: {e}")
+                    broken = True
+                    continue
+                if not broken:
+                    prefix = prefix + page_articles
+                articles = articles + page_articles
+    return articles, prefix, max(pages, 1), not broken and pages >= needed
+
+
+def _shift(published_at, hours):
+    moment = datetime.strptime(published_at[:19], TIME_FORMAT[:-1]) + timedelta(hours=hours)
+    return moment.strftime(TIME_FORMAT)
+
+
+def _archive_path(published_at, root=ARCHIVE_DIR):
+    return os.path.join(root, f"{published_at[:7]}.jsonl.gz")
+
+
+def store_articles(articles, root=ARCHIVE_DIR):
+    """Archive articles not seen before; returns how many.
+
+    An article is a repeat if its URL is already archived, or if the same
+    normalized title was published less than TITLE_WINDOW_HOURS either side
+    of it (a syndicated copy). Recurring headlines on other days are kept.
+    """
+    conn = _connect(root)
+    fresh = []
+    seen_titles = {}
+    for article in articles:
+        title, url, published = article.get("title"), article.get("url"), article.get("publishedAt")
+        if not (title and url and published):
+            continue
+        t_hash = title_hash(title)
+        u_hash = url_hash(url)
+        try:
+            earliest, latest = _shift(published, -TITLE_WINDOW_HOURS), _shift(published, TITLE_WINDOW_HOURS)
+        except ValueError:
+            continue
+        if any(earliest < other < latest for other in seen_titles.get(t_hash, ())):
+            continue
+        known = conn.execute(
+            "SELECT 1 FROM articles WHERE url_hash = ? UNION ALL "
+            "SELECT 1 FROM articles WHERE title_hash = ? AND published_at > ? AND published_at < ? LIMIT 1",
+            (u_hash, t_hash, earliest, latest),
+        ).fetchone()
+        if known:
+            continue
+        seen_titles.setdefault(t_hash, []).append(published)
+        fresh.append((u_hash, t_hash, article))
+
+    if not fresh:
+        return 0
+
+    by_file = {}
+    for u_hash, t_hash, article in fresh:
+        by_file.setdefault(_archive_path(article["publishedAt"], root), []).append(article)
+
+    with _write_lock:
+        for path, batch in by_file.items():
+            # Appending a new gzip member keeps earlier polls untouched
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                for article in batch:
+                    f.write(json.dumps(article) + "\n")
+        conn.executemany(
+            "INSERT OR IGNORE INTO articles (url_hash, title_hash, title, source, published_at, archive)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (u_hash, t_hash, a["title"], (a.get("source") or {}).get("name"),
+                 a["publishedAt"], os.path.basename(_archive_path(a["publishedAt"], root)))
+                for u_hash, t_hash, a in fresh
+            ],
+        )
+        conn.commit()
+    return len(fresh)
+
+
+def poll_news(max_pages=MAX_PAGES, session=None):
+    """Fetch the newest page since the cursor, then spend the rest of the page
+    budget filling gaps; returns the number of new articles archived"""
+    state = cursor()
+    since, gaps = state["cursor"], state["gaps"]
+    now = datetime.now(timezone.utc)
+    if since is None:
+        since = (now - timedelta(hours=LOOKBACK_HOURS)).strftime(TIME_FORMAT)
+    session = session or get_session()
+
+    # Newest first, so the analysts never read stale headlines while a backlog is open
+    try:
+        articles, prefix, used, done = _fetch_range(since, None, 1, session)
+    except Exception as e:
+        print(f"⚠️ NewsAPI error: {e}")
+        return 0
+    published = [a["publishedAt"] for a in prefix if a.get("publishedAt")]
+    top = max(published, default=since)
+    if not done and published:
+        gaps.append([since, min(published)])
+
+    expired = (now - timedelta(days=GAP_MAX_DAYS)).strftime(TIME_FORMAT)
+    if any(gap[1] < expired for gap in gaps):
+        print(f"⚠️ Giving up on news gaps older than {GAP_MAX_DAYS} days")
+        gaps = [gap for gap in gaps if gap[1] >= expired]
+
+    # Remaining budget goes to the gaps, most recent first
+    for gap in sorted(gaps, key=lambda g: g[1], reverse=True):
+        if used >= max_pages:
+            break
+        try:
+            fetched, prefix, pages, done = _fetch_range(gap[0], gap[1], max_pages - used, session)
+        except Exception as e:
+            print(f"⚠️ NewsAPI error: {e}")
+            break
+        used += pages
+        articles = articles + fetched
+        published = [a["publishedAt"] for a in prefix if a.get("publishedAt")]
+        if done:
+            gaps.remove(gap)
+        elif published:
+            gap[1] = min(published)  # everything from here up to the old upper end is archived
+
+    stored = store_articles(articles)
+    save_cursor({"cursor": top, "gaps": gaps})
+    if gaps:
+        print(f"⏳ News backlog: {len(gaps)} gap(s), oldest from {min(g[0] for g in gaps)}")
+    print(f"📰 News: {len(articles)} fetched since {since} over {used} page(s), {stored} new archived")
+    return stored
+
+
+def recent_headlines(limit=15, since=None):
+    """Newest archived titles (one per distinct headline), newest first"""
+    query = "SELECT title FROM articles"
+    params = []
+    if since:
+        query += " WHERE published_at >= ?"
+        params.append(since)
+    query += " ORDER BY published_at DESC LIMIT ?"
+    params.append(limit)
+    return [row[0] for row in _connect().execute(query, params).fetchall()]
+
+
+def load_articles(since=None, root=ARCHIVE_DIR):
+    """Full archived articles (oldest file first), optionally only those published since `since`"""
+    names = sorted(n for n in os.listdir(root) if n.endswith(".jsonl.gz")) if os.path.isdir(root) else []
+    if since:
+        names = [n for n in names if n[:7] >= since[:7]]
+    articles = []
+    for name in names:
+        with gzip.open(os.path.join(root, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                article = json.loads(line)
+                if not since or article["publishedAt"] >= since:
+                    articles.append(article)
+    return articles
+
+
+if __name__ == "__main__":
+    poll_news()
+    for headline in recent_headlines():
+        print(f"  • {headline}")
@@ -0,0 +1,168 @@
+# orchestrator.py - Run the whole pipeline as one async DAG in a single process
+#
+#   collect ─┬─────────────► technical ─┐
+#            └─► sentiment ◄─ news      ├─► ensemble ─► score
+#                    └──────────────────┘
+#
+# Market collection and the news poll start together; each analyst starts as
+# soon as its inputs are ready, the ensemble combines what they saved, and the
+# scorekeeper runs last. Imports, HTTP sessions and LLM clients are set up
+# once, so in --daemon mode every cycle after the first only pays for the
+# actual work. The daemon follows the NYSE calendar: it cycles while the
+# market is open, scores once per new close, and sleeps through nights,
+# weekends and holidays instead of polling the APIs.
+import argparse
+import asyncio
+import time
+from datetime import datetime
+import ensemble
+import market_calendar
+import news_archive
+import scorekeeper
+import sentiment_analyst
+import technical_analyst
+from data_collector import STOCK_SYMBOLS, fetch_stock_prices, store_market_data, save_market_data
+from rate_limiter import print_wait_stats
+from llm_cache import cache_report
+
+DEFAULT_INTERVAL = 300  # seconds between cycles in --daemon mode
+
+
+def collect(symbols):
+    """Fetch quotes and persist them; returns the number of symbols fetched"""
+    batch = fetch_stock_prices(symbols)
+    fetched = sum(1 for d in batch.values() if d)
+    if not fetched:
+        raise RuntimeError("no market data fetched")
+    store_market_data(batch)
+    save_market_data(batch)
+    return fetched
+
+
+async def technical(symbols):
+    predictions = await technical_analyst.predict_many(symbols)
+    return await asyncio.to_thread(technical_analyst.save_predictions, predictions)
+
+
+async def sentiment(symbols):
+    headlines = await asyncio.to_thread(news_archive.recent_headlines)
+    responses = await sentiment_analyst.predict_many(symbols, headlines)
+    return await asyncio.to_thread(sentiment_analyst.save_predictions, responses)
+
+
+def build_stages(symbols, score=True):
+    """name → (dependencies, zero-argument coroutine factory)"""
+    stages = {
+        "collect": ((), lambda: asyncio.to_thread(collect, symbols)),
+        "news": ((), lambda: asyncio.to_thread(news_archive.poll_news)),
+        "technical": (("collect",), lambda: technical(symbols)),
+        "sentiment": (("collect", "news"), lambda: sentiment(symbols)),
+        "ensemble": (("technical", "sentiment"), lambda: asyncio.to_thread(lambda: len(ensemble.run_ensemble()))),
+    }
+    if score:
+        stages["score"] = (("ensemble",), lambda: asyncio.to_thread(scorekeeper.run_scorekeeper))
+    return stages
+
+
+async def run_dag(stages):
+    """Run stages as soon as their dependencies succeed; returns per-stage timing.
+
+    A stage whose dependency failed or was skipped is skipped too.
+    """
+    origin = time.perf_counter()
+    timings = {}
+    tasks = {}
+
+    async def run(name):
+        deps, factory = stages[name]
+        outcomes = await asyncio.gather(*(tasks[d] for d in deps))
+        if not all(outcomes):
+            timings[name] = {"status": "skipped", "start": None, "duration": 0.0, "result": None}
+            return False
+        start = time.perf_counter()
+        try:
+            result = await factory()
+            status = "ok"
+        except Exception as e:
+            print(f"❌ Stage {name} failed: {e}")
+            result, status = None, "failed"
+        timings[name] = {
+            "status": status,
+            "start": start - origin,
+            "duration": time.perf_counter() - start,
+            "result": result,
+        }
+        return status == "ok"
+
+    for name in stages:
+        tasks[name] = asyncio.ensure_future(run(name))
+    await asyncio.gather(*tasks.values())
+    return timings
+
+
+def print_timings(timings, total):
+    print("\n⏱️  Pipeline stages:")
+    for name, t in timings.items():
+        start = "    -" if t["start"] is None else f"{t['start']:5.2f}"
+        result = "" if t["result"] is None else f"  → {t['result']}"
+        print(f"   {name:<10} start {start}s  took {t['duration']:6.2f}s  {t['status']}{result}")
+    print(f"   {'total':<10} {total:.2f}s")
+
+
+async def run_pipeline(symbols=None, score=True):
+    """One collect → analyze → score cycle (score=False stops after the ensemble)"""
+    symbols = list(symbols or STOCK_SYMBOLS)
+    print(f"\n🚀 Stock Oracle pipeline — {len(symbols)} symbol(s) at {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print("=" * 60)
+    started = time.perf_counter()
+    timings = await run_dag(build_stages(symbols, score))
+    print_timings(timings, time.perf_counter() - started)
+    print_wait_stats()
+    print(cache_report())
+    return timings
+
+
+async def run_daemon(symbols=None, interval=DEFAULT_INTERVAL):
+    """Cycle every `interval` seconds (start to start) during NYSE sessions until interrupted.
+
+    Scoring only runs once a new close exists; outside sessions the daemon
+    sleeps until the next open, after one final cycle for the close it just saw.
+    """
+    scored_close = None
+    while True:
+        started = time.monotonic()
+        close = market_calendar.latest_close()
+        if market_calendar.is_open() or close != scored_close:
+            timings = await run_pipeline(symbols, score=(close != scored_close))
+            if timings.get("score", {}).get("status") == "ok":
+                scored_close = close
+        remaining = max(0.0, interval - (time.monotonic() - started))
+        if close != scored_close:
+            delay = remaining  # scoring failed: retry on the normal interval
+        else:
+            delay = market_calendar.seconds_until_next_cycle(remaining)
+        if not market_calendar.is_open() and close == scored_close:
+            print(f"\n💤 Market closed, sleeping until {market_calendar.next_open():%Y-%m-%d %H:%M %Z}")
+        else:
+            print(f"\n💤 Next cycle in {delay:.0f}s")
+        await asyncio.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stock Oracle pipeline orchestrator")
+    parser.add_argument("--symbols", nargs="+", help="Symbols to run (default: config STOCK_SYMBOLS)")
+    parser.add_argument("--daemon", action="store_true", help="Keep running, following the market calendar")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between daemon cycles while the market is open")
+    args = parser.parse_args()
+
+    try:
+        if args.daemon:
+            asyncio.run(run_daemon(args.symbols, args.interval))
+        else:
+            asyncio.run(run_pipeline(args.symbols))
+    except KeyboardInterrupt:
+        print("\n👋 Orchestrator stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# prediction_log.py - Append-only, checksummed prediction record log
+#
+# Replaces the free-form predictions.txt CSV, whose REASONING field could
+# contain commas and whose concurrent appends could interleave. Each record is
+#
+#     MAGIC (4 bytes) | length (uint32 LE) | CRC32 of payload (uint32 LE) | payload
+#
+# where the payload is one ASCII-only JSON object. Appenders take an exclusive
+# flock and write a whole batch in one write() followed by one fsync, so
+# records from parallel agent processes never interleave. Readers need no lock:
+# they consume complete records from a byte offset and stop at a tail that is
+# still being written. A record torn by a crashed writer fails its checksum and
+# is skipped by scanning for the next MAGIC (which can never occur inside a
+# payload, since payloads are pure ASCII).
+import json
+import os
+import struct
+import zlib
+from datetime import datetime
+import config
+from config import STOCK_SYMBOL
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still single write() calls, just unlocked
+    fcntl = None
+
+LOG_FILE = getattr(config, "PREDICTION_LOG", "predictions.log")
+LEGACY_FILE = "predictions.txt"
+FSYNC = getattr(config, "PREDICTION_LOG_FSYNC", True)
+FORMAT = "prediction_log/1"  # readers keep this next to their offsets
+MAGIC = b"\xffPL\x01"
+HEADER = struct.Struct("<4sII")
+MAX_RECORD = 1 << 20  # a larger length can only be a corrupt header
+FIELDS = ("agent", "prediction", "confidence", "reasoning", "timestamp", "symbol")
+
+
+def encode(record):
+    """One framed record (bytes) for a prediction dict"""
+    payload = json.dumps({field: record.get(field, "") for field in FIELDS}, separators=(",", ":")).encode("ascii")
+    return HEADER.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+
+def _locked(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+
+def _unlocked(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def append(records, path=LOG_FILE, sync=None):
+    """Append prediction dicts as one locked write (+ one fsync); returns how many were written"""
+    records = list(records)
+    if not records:
+        return 0
+    if path == LOG_FILE:
+        migrate_legacy()
+    blob = b"".join(encode(r) for r in records)
+    with open(path, "ab") as f:
+        _locked(f)
+        try:
+            f.write(blob)
+            f.flush()
+            if FSYNC if sync is None else sync:
+                os.fsync(f.fileno())
+        finally:
+            _unlocked(f)
+    return len(records)
+
+
+def read_records(offset=0, path=LOG_FILE):
+    """(records, next_offset) for every complete record at or after `offset`"""
+    if path == LOG_FILE:
+        migrate_legacy()
+    if not os.path.exists(path):
+        return [], 0
+    if os.path.getsize(path) < offset:
+        print("⚠️  prediction log shrank; reading it from the start")
+        offset = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+
+    records = []
+    pos = 0
+    skipped = 0
+    while pos + HEADER.size <= len(data):
+        magic, length, crc = HEADER.unpack_from(data, pos)
+        start = pos + HEADER.size
+        if magic == MAGIC and length <= MAX_RECORD and start + length > len(data):
+            break  # still being written
+        payload = data[start:start + length]
+        if magic == MAGIC and len(payload) == length and zlib.crc32(payload) == crc:
+            try:
+                records.append(json.loads(payload))
+                pos = start + length
+                continue
+            except ValueError:
+                pass
+        # Corrupt or torn record: resynchronise on the next MAGIC
+        found = data.find(MAGIC, pos + 1)
+        next_pos = found if found >= 0 else max(pos + 1, len(data) - len(MAGIC) + 1)
+        skipped += next_pos - pos
+        pos = next_pos
+    if skipped:
+        print(f"⚠️  Skipped {skipped} corrupt byte(s) in {path}")
+    return records, offset + pos
+
+
+def _is_timestamp(value):
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def parse_legacy_line(line):
+    """Parse a predictions.txt line: AGENT,PREDICTION,CONFIDENCE,REASONING,TIMESTAMP[,SYMBOL].
+
+    Fields are taken from both ends, so commas inside REASONING survive.
+    Older lines without a SYMBOL field are attributed to STOCK_SYMBOL.
+    """
+    parts = line.strip().split(",")
+    if len(parts) < 5:
+        return None
+    if _is_timestamp(parts[-1]):
+        symbol, timestamp, reasoning_end = STOCK_SYMBOL, parts[-1], len(parts) - 1
+    elif len(parts) >= 6 and _is_timestamp(parts[-2]):
+        symbol, timestamp, reasoning_end = parts[-1], parts[-2], len(parts) - 2
+    else:
+        return None
+    return {
+        "agent": parts[0],
+        "prediction": parts[1],
+        "confidence": parts[2],
+        "reasoning": ",".join(parts[3:reasoning_end]),
+        "timestamp": timestamp,
+        "symbol": symbol,
+    }
+
+
+def migrate_legacy(path=LOG_FILE, legacy=LEGACY_FILE):
+    """Convert predictions.txt into the log once, before the log first exists"""
+    if os.path.exists(path) or not os.path.exists(legacy):
+        return 0
+    with open(legacy, "rb") as source:
+        _locked(source)  # one migrator at a time; the others find the log already there
+        try:
+            if os.path.exists(path):
+                return 0
+            records = [parse_legacy_line(line) for line in source.read().decode("utf-8", errors="replace").splitlines()]
+            records = [r for r in records if r]
+            with open(path + ".tmp", "wb") as f:
+                f.write(b"".join(encode(r) for r in records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        finally:
+            _unlocked(source)
+    print(f"📦 Migrated {len(records)} prediction(s) from {legacy} to {path}")
+    return len(records)
@@ -0,0 +1,130 @@
+# rate_limiter.py - Token-bucket quota scheduler shared by every API caller
+#
+# One bucket per provider. Callers reserve a slot and sleep until it is theirs
+# instead of firing the request and getting an "API Error" back. If
+# RATE_LIMIT_STATE_FILE is set in config.py, bucket state lives in that file
+# (guarded by an flock) so separately launched agents share the same quota.
+import asyncio
+import json
+import threading
+import time
+import config
+from endpoints import OFFLINE_URL
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process buckets
+    fcntl = None
+
+# provider -> (requests, per_seconds); override with RATE_LIMITS in config.py
+DEFAULT_LIMITS = {
+    "alphavantage": (5, 60),
+    "newsapi": (100, 86400),
+    "groq": (30, 60),
+}
+RATE_LIMITS = {**DEFAULT_LIMITS, **getattr(config, "RATE_LIMITS", {})}
+STATE_FILE = getattr(config, "RATE_LIMIT_STATE_FILE", None)
+
+_lock = threading.Lock()
+_buckets = {}     # provider -> {"tokens": float, "updated": float}
+_wait_stats = {}  # provider -> {"calls": int, "total_wait": float, "max_wait": float}
+
+
+def _refill(bucket, provider, now):
+    """Top a bucket up for the time elapsed since its last update"""
+    capacity, period = RATE_LIMITS[provider]
+    elapsed = max(0.0, now - bucket["updated"])
+    bucket["tokens"] = min(float(capacity), bucket["tokens"] + elapsed * capacity / period)
+    bucket["updated"] = now
+
+
+def _reserve_local(provider, now):
+    bucket = _buckets.setdefault(provider, {"tokens": float(RATE_LIMITS[provider][0]), "updated": now})
+    _refill(bucket, provider, now)
+    bucket["tokens"] -= 1
+    return bucket["tokens"]
+
+
+def _reserve_shared(provider, now):
+    """Reserve a token in the cross-process state file"""
+    with open(STATE_FILE, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            bucket = state.setdefault(provider, {"tokens": float(RATE_LIMITS[provider][0]), "updated": now})
+            _refill(bucket, provider, now)
+            bucket["tokens"] -= 1
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            f.flush()
+            return bucket["tokens"]
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def reserve(provider):
+    """Claim the next slot for a provider; return seconds to wait before using it.
+
+    Tokens may go negative: each caller gets a distinct future slot, so
+    waiters are served in the order they asked.
+    """
+    if OFFLINE_URL or provider not in RATE_LIMITS:
+        return 0.0  # the replay server has no quota to protect
+    now = time.time()
+    with _lock:
+        if STATE_FILE and fcntl:
+            tokens = _reserve_shared(provider, now)
+        else:
+            tokens = _reserve_local(provider, now)
+    capacity, period = RATE_LIMITS[provider]
+    return max(0.0, -tokens * period / capacity)
+
+
+def _record_wait(provider, waited):
+    with _lock:
+        stats = _wait_stats.setdefault(provider, {"calls": 0, "total_wait": 0.0, "max_wait": 0.0})
+        stats["calls"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+
+def acquire(provider):
+    """Block until the caller may hit `provider`; returns the time spent queued"""
+    wait = reserve(provider)
+    if wait > 0:
+        time.sleep(wait)
+    _record_wait(provider, wait)
+    return wait
+
+
+async def acquire_async(provider):
+    """Async variant of acquire() for coroutine callers"""
+    if STATE_FILE and fcntl:
+        wait = await asyncio.to_thread(reserve, provider)  # flock + file I/O off the loop
+    else:
+        wait = reserve(provider)
+    if wait > 0:
+        await asyncio.sleep(wait)
+    _record_wait(provider, wait)
+    return wait
+
+
+def wait_stats():
+    """Per-provider queueing stats: calls, total/avg/max seconds waited"""
+    with _lock:
+        return {
+            provider: {**stats, "avg_wait": stats["total_wait"] / stats["calls"] if stats["calls"] else 0.0}
+            for provider, stats in _wait_stats.items()
+        }
+
+
+def print_wait_stats():
+    """Print how long callers queued for each provider"""
+    for provider, stats in wait_stats().items():
+        print(f"⏱️  {provider}: {stats['calls']} call(s), waited {stats['total_wait']:.1f}s total "
+              f"(avg {stats['avg_wait']:.2f}s, max {stats['max_wait']:.2f}s)")
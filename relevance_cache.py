@@ -0,0 +1,77 @@
+# relevance_cache.py - Per-headline relevance decisions, keyed by normalized title
+#
+# Consecutive NewsAPI pulls overlap heavily, so each headline's keep/drop
+# decision is stored once and reused; only headlines never seen before are
+# sent to the LLM. Decisions are scoped to the selection criteria (a hash of
+# the system prompt), so changing the prompt starts a fresh set.
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = "headline_relevance.db"
+MAX_AGE = 30 * 86400  # seconds before a decision is forgotten
+
+_local = threading.local()
+_SOURCE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,40}$")
+_NON_WORD = re.compile(r"[^a-z0-9&$%]+")
+
+
+def _connect(path=CACHE_FILE):
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS relevance ("
+            " criteria TEXT NOT NULL, title_hash TEXT NOT NULL, title TEXT NOT NULL,"
+            " relevant INTEGER NOT NULL, decided_at REAL NOT NULL,"
+            " PRIMARY KEY (criteria, title_hash))"
+        )
+        _local.conn = conn
+    return conn
+
+
+def normalize_title(title):
+    """Lowercase, drop a trailing ' - Outlet' suffix and punctuation, collapse spaces"""
+    title = _SOURCE_SUFFIX.sub("", title.strip())
+    return " ".join(_NON_WORD.sub(" ", title.lower()).split())
+
+
+def title_hash(title):
+    return hashlib.sha1(normalize_title(title).encode()).hexdigest()
+
+
+def criteria_hash(system_prompt):
+    return hashlib.sha1(system_prompt.encode()).hexdigest()[:16]
+
+
+def lookup(criteria, headlines):
+    """Known decisions → {title_hash: bool} for the given headlines"""
+    hashes = list({title_hash(h) for h in headlines})
+    if not hashes:
+        return {}
+    conn = _connect()
+    cutoff = time.time() - MAX_AGE
+    found = {}
+    for i in range(0, len(hashes), 500):  # stay under SQLite's parameter limit
+        chunk = hashes[i:i + 500]
+        rows = conn.execute(
+            f"SELECT title_hash, relevant FROM relevance WHERE criteria = ? AND decided_at >= ? "
+            f"AND title_hash IN ({','.join('?' * len(chunk))})",
+            [criteria, cutoff, *chunk],
+        ).fetchall()
+        found.update((h, bool(relevant)) for h, relevant in rows)
+    return found
+
+
+def record(criteria, decisions):
+    """Store {headline: relevant} decisions and drop expired ones"""
+    now = time.time()
+    conn = _connect()
+    conn.executemany(
+        "INSERT OR REPLACE INTO relevance (criteria, title_hash, title, relevant, decided_at) VALUES (?, ?, ?, ?, ?)",
+        [(criteria, title_hash(h), h, int(relevant), now) for h, relevant in decisions.items()],
+    )
+    conn.execute("DELETE FROM relevance WHERE decided_at < ?", (now - MAX_AGE,))
+    conn.commit()
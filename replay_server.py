@@ -0,0 +1,384 @@
+# replay_server.py - Offline stand-in for Alpha Vantage, NewsAPI and Groq
+#
+# Serves recorded fixtures when present, synthetic data otherwise:
+#   GET  /query?function=GLOBAL_QUOTE&symbol=SPY
+#   GET  /query?function=TIME_SERIES_DAILY&symbol=SPY&outputsize=compact|full
+#   GET  /v2/everything?pageSize=15&page=1&from=...[&to=...]
+#   POST /openai/v1/chat/completions          (what the Groq SDK calls)
+#
+# Fixtures are raw API responses saved as <fixtures>/GLOBAL_QUOTE_<SYMBOL>.json,
+# TIME_SERIES_DAILY_<SYMBOL>.json, everything.json and chat_completions.json.
+#
+# Usage:
+#   python replay_server.py --port 8765 --latency-ms 40 --error-rate 0.02
+#   STOCK_ORACLE_OFFLINE=http://127.0.0.1:8765 python data_collector.py
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+HEADLINE_TEMPLATES = [
+    "{sym} climbs as investors cheer upbeat earnings guidance",
+    "{sym} slips after Federal Reserve signals rates stay higher for longer",
+    "Wall Street rallies as inflation cools more than expected",
+    "Stocks fall as Treasury yields jump to multi-month highs",
+    "S&P 500 hits record high on tech strength",
+    "Markets mixed ahead of jobs report",
+    "Oil prices surge, weighing on consumer stocks",
+    "Investors rotate into defensive sectors amid recession fears",
+    "Chipmakers lead Nasdaq gains on AI demand",
+    "Retail sales beat forecasts, lifting consumer discretionary shares",
+    "Bank stocks drop after weak quarterly results",
+    "Dow slides as trade tensions escalate",
+    "Celebrity chef opens new restaurant in Paris",
+    "Local team wins championship in overtime thriller",
+]
+SOURCES = ["Reuters", "Bloomberg", "CNBC", "MarketWatch", "Yahoo Finance", "WSJ"]
+
+
+def _seed(*parts):
+    """Stable integer seed from arbitrary parts"""
+    return int(hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:16], 16)
+
+
+def _weekdays_back(end, count):
+    """The last `count` weekdays up to and including `end`, oldest first"""
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def synthetic_daily(symbol, count):
+    """Deterministic random walk of daily bars, anchored at the latest session.
+
+    Each day's return depends only on (symbol, day) and the walk runs
+    backwards from a fixed latest close, so compact, full and quote
+    responses all agree on overlapping days.
+    """
+    today = datetime.now(timezone.utc).date()
+    close = 50 + random.Random(_seed("anchor", symbol)).random() * 450
+    bars = []
+    for day in reversed(_weekdays_back(today, count)):
+        rng = random.Random(_seed("bar", symbol, day))
+        open_ = close / (1 + rng.gauss(0.0003, 0.012))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.004)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.004)))
+        bars.append((day.isoformat(), {
+            "1. open": f"{open_:.4f}",
+            "2. high": f"{high:.4f}",
+            "3. low": f"{low:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(int(rng.uniform(5e5, 9e7))),
+        }))
+        close = open_
+    return dict(reversed(bars))
+
+
+def synthetic_quote(symbol):
+    """GLOBAL_QUOTE built from the last two synthetic daily bars"""
+    series = synthetic_daily(symbol, 2)
+    (prev_day, prev), (day, bar) = sorted(series.items())
+    close, prev_close = float(bar["4. close"]), float(prev["4. close"])
+    change = close - prev_close
+    return {
+        "Global Quote": {
+            "01. symbol": symbol,
+            "02. open": bar["1. open"],
+            "03. high": bar["2. high"],
+            "04. low": bar["3. low"],
+            "05. price": f"{close:.4f}",
+            "06. volume": bar["5. volume"],
+            "07. latest trading day": day,
+            "08. previous close": f"{prev_close:.4f}",
+            "09. change": f"{change:.4f}",
+            "10. change percent": f"{change / prev_close * 100:.4f}%",
+        }
+    }
+
+
+def synthetic_articles(count, newest=None):
+    """Synthetic NewsAPI articles, newest first, one every ~7 minutes"""
+    newest = newest or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    articles = []
+    for i in range(count):
+        published = newest - timedelta(minutes=7 * i)
+        rng = random.Random(_seed("article", published.isoformat()))
+        title = rng.choice(HEADLINE_TEMPLATES).format(sym=rng.choice(["SPY", "Apple", "Nvidia", "Tesla"]))
+        source = rng.choice(SOURCES)
+        articles.append({
+            "source": {"id": None, "name": source},
+            "title": title,
+            "url": f"https://example.com/{source.lower().replace(' ', '-')}/{published:%Y%m%d%H%M}",
+            "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+    return articles
+
+
+def _fake_value(schema, context_lines, rng, index=None, count=None):
+    """Fill a JSON schema with plausible values (used for tool-call arguments).
+
+    Inside an array of objects, the first property whose enum has exactly
+    one value per item (e.g. a symbol list) is enumerated in order.
+    """
+    kind = schema.get("type")
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if kind == "object":
+        values = {}
+        keyed = False
+        for name, sub in schema.get("properties", {}).items():
+            if not keyed and index is not None and len(sub.get("enum", [])) == count:
+                values[name] = sub["enum"][index]
+                keyed = True
+            else:
+                values[name] = _fake_value(sub, context_lines, rng)
+        return values
+    if kind == "array":
+        items = schema.get("items", {})
+        if items.get("type") == "string" and context_lines:
+            return [line for line in context_lines if rng.random() < 0.6]
+        count = schema.get("minItems") or rng.randint(1, 3)
+        return [_fake_value(items, context_lines, rng, i, count) for i in range(count)]
+    if kind in ("number", "integer"):
+        return round(rng.random(), 3) if kind == "number" else rng.randint(0, 10)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return "Synthetic reasoning from the offline stand-in."
+
+
+def synthetic_completion(request):
+    """Chat-completions response shaped like the OpenAI/Groq schema"""
+    messages = request.get("messages", [])
+    user_text = messages[-1].get("content", "") if messages else ""
+    rng = random.Random(_seed("chat", json.dumps(messages, sort_keys=True)))
+    message = {"role": "assistant", "content": None}
+    finish_reason = "stop"
+
+    tools = request.get("tools") or []
+    if tools:
+        function = tools[0]["function"]
+        lines = [line.strip() for line in user_text.splitlines() if line.strip()]
+        arguments = _fake_value(function.get("parameters", {}), lines, rng)
+        message["tool_calls"] = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+        }]
+        finish_reason = "tool_calls"
+    else:
+        message["content"] = (
+            f"PREDICTION: {rng.choice(['UP', 'DOWN'])}\n"
+            f"CONFIDENCE: {rng.choice(['HIGH', 'MEDIUM', 'LOW'])}\n"
+            "REASONING: Synthetic verdict from the offline stand-in."
+        )
+
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "offline"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 30, "total_tokens": prompt_tokens + 30},
+    }
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Routes the three upstream APIs; settings live on the server object"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _fixture(self, name):
+        if not self.server.fixtures:
+            return None
+        path = os.path.join(self.server.fixtures, name)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, payload):
+        """Replay a completion as server-sent events, one small chunk per token"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        content = payload["choices"][0]["message"].get("content") or ""
+        tokens = re.findall(r"\S+\s*|\s+", content)
+        base = {k: payload[k] for k in ("id", "created", "model")}
+        try:
+            for i, token in enumerate(tokens):
+                delta = {"content": token}
+                if i == 0:
+                    delta["role"] = "assistant"
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                if self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+            done = {**base, "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client stopped generation early
+
+    def _delay_and_maybe_fail(self, alpha_vantage=False):
+        """Apply configured latency; return True if an error was injected"""
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        with server.stats_lock:
+            server.stats["requests"] += 1
+        if random.random() >= server.error_rate:
+            return False
+
+        with server.stats_lock:
+            server.stats["errors"] += 1
+        if alpha_vantage:
+            # Alpha Vantage reports throttling as a 200 with a "Note"
+            self._send_json(200, {"Note": "Thank you for using Alpha Vantage! (injected rate-limit error)"})
+        else:
+            self._send_json(random.choice([429, 500, 503]), {"error": {"message": "injected error"}})
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/query":
+            if self._delay_and_maybe_fail(alpha_vantage=True):
+                return
+            function = params.get("function", "")
+            symbol = params.get("symbol", "SPY").upper()
+            payload = self._fixture(f"{function}_{symbol}.json")
+            if payload is None and function == "GLOBAL_QUOTE":
+                payload = synthetic_quote(symbol)
+            elif payload is None and function == "TIME_SERIES_DAILY":
+                count = 5000 if params.get("outputsize") == "full" else 100
+                payload = {
+                    "Meta Data": {"2. Symbol": symbol},
+                    "Time Series (Daily)": dict(reversed(list(synthetic_daily(symbol, count).items()))),
+                }
+            elif payload is None:
+                payload = {"Error Message": f"Unsupported function {function!r}"}
+            self._send_json(200, payload)
+
+        elif url.path == "/v2/everything":
+            if self._delay_and_maybe_fail():
+                return
+            page_size = int(params.get("pageSize", 20))
+            page = int(params.get("page", 1))
+            articles = (self._fixture("everything.json") or {}).get("articles") or synthetic_articles(500)
+            if "from" in params:
+                cutoff = params["from"].replace("Z", "")
+                articles = [a for a in articles if a["publishedAt"].replace("Z", "") >= cutoff]
+            if "to" in params:
+                cutoff = params["to"].replace("Z", "")
+                articles = [a for a in articles if a["publishedAt"].replace("Z", "") <= cutoff]
+            start = (page - 1) * page_size
+            self._send_json(200, {
+                "status": "ok",
+                "totalResults": len(articles),
+                "articles": articles[start:start + page_size],
+            })
+
+        else:
+            self._send_json(404, {"error": {"message": f"No route for {url.path}"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if url.path.endswith("/chat/completions"):
+            if self._delay_and_maybe_fail():
+                return
+            payload = self._fixture("chat_completions.json") or synthetic_completion(request)
+            if request.get("stream"):
+                self._send_stream(payload)
+            else:
+                self._send_json(200, payload)
+        else:
+            self._send_json(404, {"error": {"message": f"No route for {url.path}"}})
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open many connections at once
+
+
+def make_server(host="127.0.0.1", port=8765, latency_ms=0, jitter_ms=0, error_rate=0.0, fixtures=None,
+                verbose=False, token_ms=0):
+    """Build (but do not start) a replay server"""
+    server = ReplayServer((host, port), ReplayHandler)
+    server.latency = latency_ms / 1000
+    server.jitter = jitter_ms / 1000
+    server.error_rate = error_rate
+    server.token_delay = token_ms / 1000
+    server.fixtures = fixtures
+    server.verbose = verbose
+    server.stats = {"requests": 0, "errors": 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline market/news/LLM stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Fixed delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra uniform random delay")
+    parser.add_argument("--token-ms", type=float, default=0, help="Delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+    parser.add_argument("--fixtures", help="Directory of recorded API responses")
+    parser.add_argument("--seed", type=int, help="Seed for latency/error injection")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms,
+                         args.error_rate, args.fixtures, args.verbose, args.token_ms)
+    print(f"🎭 Replay server on http://{args.host}:{args.port}")
+    print(f"   latency={args.latency_ms}ms (+{args.jitter_ms}ms jitter), error rate={args.error_rate:.0%}")
+    print(f"   Point agents at it: STOCK_ORACLE_OFFLINE=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nShutting down... served {server.stats['requests']} request(s), "
+              f"injected {server.stats['errors']} error(s)")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# reputation_metrics.py - O(1) rolling and decayed accuracy, updated per outcome
+#
+# Lifetime correct/total hides how an agent is doing lately. Each state here
+# holds three recency views, all updated in constant time per scored outcome:
+#   last N outcomes - a ring buffer of hit bits plus a running sum
+#   last D days     - a ring of per-session-day buckets plus running sums
+#   EWMA            - decayed hit and weight accumulators (bias-corrected)
+# States are plain dicts so reputation_store can persist them as JSON.
+import math
+from datetime import date
+import config
+
+WINDOW_OUTCOMES = getattr(config, "REPUTATION_WINDOW_N", 20)
+WINDOW_DAYS = getattr(config, "REPUTATION_WINDOW_DAYS", 30)
+EWMA_HALF_LIFE = getattr(config, "REPUTATION_HALF_LIFE", 10)  # in outcomes
+DECAY = 0.5 ** (1.0 / EWMA_HALF_LIFE)
+
+
+def new_state():
+    return {
+        "n": {"bits": [0] * WINDOW_OUTCOMES, "head": 0, "count": 0, "correct": 0},
+        "days": {"slots": [[None, 0, 0] for _ in range(WINDOW_DAYS)], "latest": None, "correct": 0, "total": 0},
+        "ewma": {"hits": 0.0, "weight": 0.0},
+    }
+
+
+def compatible(state):
+    """False when the window sizes changed since the state was built"""
+    return (state is not None
+            and len(state["n"]["bits"]) == WINDOW_OUTCOMES
+            and len(state["days"]["slots"]) == WINDOW_DAYS)
+
+
+def _evict_day(days, day):
+    slot = days["slots"][day % WINDOW_DAYS]
+    if slot[0] == day:
+        days["correct"] -= slot[1]
+        days["total"] -= slot[2]
+        days["slots"][day % WINDOW_DAYS] = [None, 0, 0]
+
+
+def apply_outcome(state, correct, session):
+    """Fold one scored outcome (session = 'YYYY-MM-DD') into every metric"""
+    hit = 1 if correct else 0
+
+    ring = state["n"]
+    if ring["count"] == WINDOW_OUTCOMES:
+        ring["correct"] -= ring["bits"][ring["head"]]
+    else:
+        ring["count"] += 1
+    ring["bits"][ring["head"]] = hit
+    ring["correct"] += hit
+    ring["head"] = (ring["head"] + 1) % WINDOW_OUTCOMES
+
+    days = state["days"]
+    day = date.fromisoformat(session).toordinal()
+    latest = days["latest"]
+    if latest is None or day > latest:
+        if latest is not None and day - latest >= WINDOW_DAYS:
+            days["slots"] = [[None, 0, 0] for _ in range(WINDOW_DAYS)]
+            days["correct"] = days["total"] = 0
+        elif latest is not None:
+            # Days falling out of the window: fewer than WINDOW_DAYS buckets to clear
+            for old in range(latest - WINDOW_DAYS + 1, day - WINDOW_DAYS + 1):
+                _evict_day(days, old)
+        days["latest"] = latest = day
+    if day > latest - WINDOW_DAYS:  # older outcomes only feed the N-window and EWMA
+        slot = days["slots"][day % WINDOW_DAYS]
+        if slot[0] != day:
+            slot = days["slots"][day % WINDOW_DAYS] = [day, 0, 0]
+        slot[1] += hit
+        slot[2] += 1
+        days["correct"] += hit
+        days["total"] += 1
+
+    ewma = state["ewma"]
+    ewma["hits"] = ewma["hits"] * DECAY + hit
+    ewma["weight"] = ewma["weight"] * DECAY + 1.0
+    return state
+
+
+def metrics(state):
+    """{'last_n', 'last_n_count', 'last_days', 'last_days_count', 'ewma'}; accuracies are None when empty"""
+    ring, days, ewma = state["n"], state["days"], state["ewma"]
+    return {
+        "last_n": ring["correct"] / ring["count"] if ring["count"] else None,
+        "last_n_count": ring["count"],
+        "last_days": days["correct"] / days["total"] if days["total"] else None,
+        "last_days_count": days["total"],
+        "ewma": ewma["hits"] / ewma["weight"] if ewma["weight"] else None,
+    }
+
+
+def format_metrics(values):
+    def pct(value):
+        return "  -  " if value is None or math.isnan(value) else f"{value * 100:5.1f}%"
+    return (f"last {WINDOW_OUTCOMES}: {pct(values['last_n'])} | "
+            f"last {WINDOW_DAYS}d: {pct(values['last_days'])} | EWMA: {pct(values['ewma'])}")
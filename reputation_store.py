@@ -0,0 +1,277 @@
+# reputation_store.py - SQLite reputation store with materialized aggregates
+#
+# Every scored prediction is kept (predictions + outcomes tables, indexed by
+# agent, symbol and session), and a small aggregates table holds running
+# correct/total counts per (agent, symbol, confidence). Both are written in
+# the same transaction, so leaderboards read a table whose size depends only
+# on the number of agents/symbols, never on how much history has piled up.
+# Recency metrics (last N, last D days, EWMA) are kept the same way, as
+# reputation_metrics states per agent and per (agent, symbol).
+# Lives next to the OpenAgents network.db. The legacy reputation_scores.txt
+# totals are not carried over, since every run had re-added every prediction.
+# Outcomes are also appended to a fixed-width column file so calibration can
+# load millions of them at once.
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+import reputation_metrics
+
+DB_FILE = os.path.join("stock-oracle-network-openagents", "reputation.db")
+COLUMNS_FILE = os.path.join("stock-oracle-network-openagents", "outcome_columns.bin")
+OUTCOME_DTYPE = np.dtype([("group", "<i4"), ("correct", "i1")])  # group = aggregates rowid
+ALL_SYMBOLS = "*"  # rolling-metrics key covering every symbol an agent predicts
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    agent TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    prediction TEXT NOT NULL,
+    confidence TEXT NOT NULL,
+    reasoning TEXT,
+    made_at TEXT NOT NULL,
+    UNIQUE (agent, symbol, made_at)
+);
+CREATE TABLE IF NOT EXISTS outcomes (
+    prediction_id INTEGER PRIMARY KEY REFERENCES predictions (id),
+    session TEXT NOT NULL,
+    movement TEXT NOT NULL,
+    close REAL,
+    previous_close REAL,
+    correct INTEGER NOT NULL,
+    scored_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    agent TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    confidence TEXT NOT NULL,
+    correct INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent, symbol, confidence)
+);
+CREATE TABLE IF NOT EXISTS rolling_metrics (
+    agent TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (agent, symbol)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX IF NOT EXISTS idx_predictions_agent ON predictions (agent, made_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_symbol ON predictions (symbol, made_at);
+CREATE INDEX IF NOT EXISTS idx_outcomes_session ON outcomes (session);
+"""
+
+
+def _connect(path=DB_FILE):
+    """One sqlite connection per thread; schema set up on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        drop_legacy_totals(conn)
+    return conn
+
+
+def drop_legacy_totals(conn):
+    """Remove the reputation_scores.txt totals that earlier versions imported.
+
+    Those totals were inflated (every prediction was re-added on each run),
+    so they stay out of the aggregates; the text file itself is left alone.
+    """
+    if not conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+        return 0
+    with conn:
+        removed = conn.execute(
+            "DELETE FROM aggregates WHERE confidence = 'UNKNOWN' AND NOT EXISTS ("
+            " SELECT 1 FROM predictions p WHERE p.agent = aggregates.agent"
+            " AND p.symbol = aggregates.symbol AND p.confidence = 'UNKNOWN')"
+        ).rowcount
+        conn.execute("DELETE FROM meta WHERE key = 'legacy_imported'")
+    if removed:
+        print(f"🧹 Dropped {removed} inflated legacy total(s) from the aggregates")
+    return removed
+
+
+def _bump(conn, agent, symbol, confidence, correct, total):
+    conn.execute(
+        "INSERT INTO aggregates (agent, symbol, confidence, correct, total) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (agent, symbol, confidence) DO UPDATE SET "
+        "correct = correct + excluded.correct, total = total + excluded.total",
+        (agent, symbol, confidence, correct, total),
+    )
+    return conn.execute(
+        "SELECT rowid FROM aggregates WHERE agent = ? AND symbol = ? AND confidence = ?", (agent, symbol, confidence)
+    ).fetchone()[0]
+
+
+def _load_metrics_state(conn, agent, symbol):
+    """Saved rolling state, rebuilt from the outcomes table if missing or resized"""
+    row = conn.execute("SELECT state FROM rolling_metrics WHERE agent = ? AND symbol = ?", (agent, symbol)).fetchone()
+    state = json.loads(row[0]) if row else None
+    if reputation_metrics.compatible(state):
+        return state
+    state = reputation_metrics.new_state()
+    query = ("SELECT o.correct, o.session FROM outcomes o JOIN predictions p ON p.id = o.prediction_id "
+             "WHERE p.agent = ?")
+    params = [agent]
+    if symbol != ALL_SYMBOLS:
+        query += " AND p.symbol = ?"
+        params.append(symbol)
+    for correct, session in conn.execute(query + " ORDER BY o.session, p.made_at", params):
+        reputation_metrics.apply_outcome(state, correct, session)
+    return state
+
+
+def record_outcomes(scored):
+    """Store [(prediction, outcome)] and update aggregates in one transaction.
+
+    Each agent is scored at most once per (symbol, session): a prediction
+    whose agent already has an outcome for that session is skipped, so
+    replaying a batch or repeated daemon cycles never double-count.
+    Returns the number newly recorded.
+    """
+    conn = _connect()
+    now = datetime.now().isoformat()
+    recorded = 0
+    appended = []
+    with conn:
+        # Load every touched state before inserting, so a rebuild never sees this batch
+        states = {}
+        for pred, _ in scored:
+            for key in ((pred["agent"], ALL_SYMBOLS), (pred["agent"], pred["symbol"])):
+                if key not in states:
+                    states[key] = _load_metrics_state(conn, *key)
+
+        for pred, outcome in scored:
+            if conn.execute(
+                "SELECT 1 FROM outcomes o JOIN predictions p ON p.id = o.prediction_id "
+                "WHERE o.session = ? AND p.agent = ? AND p.symbol = ?",
+                (outcome["session"], pred["agent"], pred["symbol"]),
+            ).fetchone():
+                continue
+            conn.execute(
+                "INSERT OR IGNORE INTO predictions (agent, symbol, prediction, confidence, reasoning, made_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pred["agent"], pred["symbol"], pred["prediction"], pred["confidence"],
+                 pred.get("reasoning"), pred["timestamp"]),
+            )
+            prediction_id = conn.execute(
+                "SELECT id FROM predictions WHERE agent = ? AND symbol = ? AND made_at = ?",
+                (pred["agent"], pred["symbol"], pred["timestamp"]),
+            ).fetchone()[0]
+            correct = int(pred["prediction"] == outcome["movement"])
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO outcomes (prediction_id, session, movement, close, previous_close, correct, scored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (prediction_id, outcome["session"], outcome["movement"], outcome.get("close"),
+                 outcome.get("previous_close"), correct, now),
+            )
+            if cursor.rowcount:
+                group = _bump(conn, pred["agent"], pred["symbol"], pred["confidence"], correct, 1)
+                appended.append((group, correct))
+                for key in ((pred["agent"], ALL_SYMBOLS), (pred["agent"], pred["symbol"])):
+                    reputation_metrics.apply_outcome(states[key], correct, outcome["session"])
+                recorded += 1
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO rolling_metrics (agent, symbol, state) VALUES (?, ?, ?)",
+            [(agent, symbol, json.dumps(state)) for (agent, symbol), state in states.items()],
+        )
+    # Column file for calibration; a crash before this line is repaired by outcome_columns()
+    if appended:
+        with open(COLUMNS_FILE, "ab") as f:
+            np.array(appended, dtype=OUTCOME_DTYPE).tofile(f)
+    return recorded
+
+
+def leaderboard(symbol=None, confidence=None):
+    """{agent: {'correct', 'total'}} from the aggregates, best accuracy first"""
+    query = "SELECT agent, SUM(correct), SUM(total) FROM aggregates"
+    clauses, params = [], []
+    if symbol:
+        clauses.append("symbol = ?")
+        params.append(symbol)
+    if confidence:
+        clauses.append("confidence = ?")
+        params.append(confidence)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " GROUP BY agent ORDER BY CAST(SUM(correct) AS REAL) / MAX(SUM(total), 1) DESC, agent"
+    return {agent: {"correct": correct, "total": total}
+            for agent, correct, total in _connect().execute(query, params).fetchall()}
+
+
+def breakdown(agent):
+    """Per-symbol, per-confidence {(symbol, confidence): {'correct', 'total'}} for one agent"""
+    rows = _connect().execute(
+        "SELECT symbol, confidence, correct, total FROM aggregates WHERE agent = ? ORDER BY symbol, confidence",
+        (agent,),
+    ).fetchall()
+    return {(symbol, confidence): {"correct": correct, "total": total} for symbol, confidence, correct, total in rows}
+
+
+def recent_metrics(agent, symbol=ALL_SYMBOLS):
+    """Last-N / last-D-days / EWMA accuracy for an agent (optionally one symbol), or None"""
+    row = _connect().execute(
+        "SELECT state FROM rolling_metrics WHERE agent = ? AND symbol = ?", (agent, symbol)
+    ).fetchone()
+    return reputation_metrics.metrics(json.loads(row[0])) if row else None
+
+
+def _rebuild_columns(conn, path=COLUMNS_FILE):
+    """Rewrite the outcome column file from the tables (after a crash or on first use)"""
+    rows = conn.execute(
+        "SELECT a.rowid, o.correct FROM outcomes o JOIN predictions p ON p.id = o.prediction_id "
+        "JOIN aggregates a ON a.agent = p.agent AND a.symbol = p.symbol AND a.confidence = p.confidence "
+        "ORDER BY o.rowid"
+    ).fetchall()
+    data = np.array(rows, dtype=[("group", "<i4"), ("correct", "i1")]) if rows else np.zeros(0, OUTCOME_DTYPE)
+    data.astype(OUTCOME_DTYPE).tofile(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return data
+
+
+def outcome_columns():
+    """Every scored outcome as NumPy columns: integer-coded agent/symbol/confidence plus hit bits.
+
+    Read straight from the append-only column file (one fixed-size record per
+    outcome), so loading millions of outcomes costs a single np.fromfile.
+    Returns {'agent', 'symbol', 'confidence', 'correct'} code arrays and
+    {'agents', 'symbols', 'confidences'} name lists the codes index into.
+    """
+    conn = _connect()
+    data = np.fromfile(COLUMNS_FILE, dtype=OUTCOME_DTYPE) if os.path.exists(COLUMNS_FILE) else None
+    expected = conn.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0]
+    if data is None or len(data) != expected:
+        data = _rebuild_columns(conn)
+
+    groups = conn.execute("SELECT rowid, agent, symbol, confidence FROM aggregates").fetchall()
+    size = max((g[0] for g in groups), default=0) + 1
+    result = {}
+    for position, name in ((1, "agent"), (2, "symbol"), (3, "confidence")):
+        names = sorted({g[position] for g in groups})
+        code = {n: i for i, n in enumerate(names)}
+        lookup = np.zeros(size, dtype=np.int32)
+        for g in groups:
+            lookup[g[0]] = code[g[position]]
+        result[name] = lookup[data["group"]]
+        result[name + "s"] = names
+    result["correct"] = data["correct"]
+    return result
+
+
+def agent_record(agent, symbol, confidence):
+    """(correct, total) for one (agent, symbol, confidence) aggregate - a primary-key lookup"""
+    row = _connect().execute(
+        "SELECT correct, total FROM aggregates WHERE agent = ? AND symbol = ? AND confidence = ?",
+        (agent, symbol, confidence),
+    ).fetchone()
+    return row if row else (0, 0)
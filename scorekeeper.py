@@ -1,192 +1,334 @@
 # scorekeeper.py - Verifies predictions and updates reputation scores
 from datetime import datetime, timedelta
 from config import ALPHA_VANTAGE_KEY, STOCK_SYMBOL
-import requests
+from http_client import get_session, REQUEST_TIMEOUT
+from endpoints import ALPHA_VANTAGE_URL
+import market_store
+import market_calendar
+import prediction_log
+import reputation_store
+from reputation_metrics import format_metrics
+from rate_limiter import acquire
+import numpy as np
+import json
 import os
 
+COMPACT_MAX_DAYS = 140  # "compact" returns ~100 sessions; older gaps need "full"
+PREDICTIONS_FILE = prediction_log.LOG_FILE
+SCORE_STATE_FILE = "scorekeeper_state.json"
+VERBOSE_LIMIT = 20  # print each verification only for small batches
+
 def read_predictions():
-    """Read all predictions from file"""
-    predictions = []
-    
-    if not os.path.exists("predictions.txt"):
+    """Read all predictions from the prediction log"""
+    if not os.path.exists(PREDICTIONS_FILE) and not os.path.exists(prediction_log.LEGACY_FILE):
         print("❌ No predictions file found!")
-        return predictions
-    
+        return []
     try:
-        with open("predictions.txt", "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                parts = line.strip().split(",")
-                if len(parts) >= 5:
-                    predictions.append({
-                        "agent": parts[0],
-                        "prediction": parts[1],
-                        "confidence": parts[2],
-                        "reasoning": parts[3],
-                        "timestamp": parts[4]
-                    })
-        return predictions
+        return prediction_log.read_records(0, PREDICTIONS_FILE)[0]
     except Exception as e:
         print(f"❌ Error reading predictions: {e}")
-        return predictions
+        return []
 
-def fetch_market_movement(days_ago=1):
-    """Fetch whether market went UP or DOWN from X days ago to today"""
+def load_score_state(path=SCORE_STATE_FILE):
+    """Load {'offset', 'pending'}: bytes of the prediction log already read, and
+    predictions read but not yet matured"""
     try:
-        # Get daily time series
-        url = f"https://alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={STOCK_SYMBOL}&apikey={ALPHA_VANTAGE_KEY}"
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = None
+    if state is None or state.get("format") != prediction_log.FORMAT:
+        # Offsets into the old predictions.txt mean nothing in the log: re-read it
+        # from the start (recording outcomes is idempotent, so nothing double-counts)
+        state = {"offset": 0, "pending": [], "format": prediction_log.FORMAT}
+    return state
 
-        
-        response = requests.get(url)
+def save_score_state(state, path=SCORE_STATE_FILE):
+    """Persist the scoring watermark"""
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def read_new_predictions(state, path=PREDICTIONS_FILE):
+    """Predictions appended since state['offset']; advances the offset.
+
+    Only complete records are consumed, so one being written right now is
+    picked up whole on the next run.
+    """
+    predictions, state["offset"] = prediction_log.read_records(state["offset"], path)
+    return predictions
+
+def latest_expected_close(now=None):
+    """Date of the most recent NYSE session whose close has already happened"""
+    return market_calendar.latest_close(now).isoformat()
+
+def earliest_session(timestamp):
+    """First trading session none of which was visible when a prediction was made.
+
+    An intraday prediction has already seen part of today's move, so it
+    targets the next session; one made before the open targets today.
+    """
+    # naive timestamps are machine-local
+    return market_calendar.first_open_after(datetime.fromisoformat(timestamp))
+
+def latest_per_session(predictions):
+    """Newest prediction per (agent, symbol, target session).
+
+    The daemon re-runs the analysts every interval, so one session collects
+    many calls from each agent; only the last, best-informed one is scored.
+    """
+    latest = {}
+    for pred in predictions:
+        key = (pred["agent"], pred["symbol"], earliest_session(pred["timestamp"]))
+        if key not in latest or pred["timestamp"] >= latest[key]["timestamp"]:
+            latest[key] = pred
+    return list(latest.values())
+
+def _sync_state_path(symbol, root):
+    return os.path.join(root, symbol.upper(), "daily_sync.json")
+
+def load_sync_state(symbol=STOCK_SYMBOL, root=market_store.STORE_DIR):
+    """Load {'final_through', 'checked_through'} for the daily-bar cache"""
+    try:
+        with open(_sync_state_path(symbol, root), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"final_through": None, "checked_through": None}
+
+def save_sync_state(symbol, state, root=market_store.STORE_DIR):
+    """Persist the daily-bar cache watermark"""
+    path = _sync_state_path(symbol, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def sync_daily_bars(symbol=STOCK_SYMBOL, root=market_store.STORE_DIR, now=None):
+    """Bring the on-disk daily bars up to the latest settled close.
+
+    Makes no network call when the cache already covers the latest close.
+    Returns the number of settled bars added, or None if the fetch failed.
+    """
+    state = load_sync_state(symbol, root)
+    final_through = state.get("final_through")
+    expected = latest_expected_close(now)
+
+    if state.get("checked_through") and state["checked_through"] >= expected:
+        return 0
+
+    if final_through and (datetime.fromisoformat(expected) - datetime.fromisoformat(final_through)).days <= COMPACT_MAX_DAYS:
+        outputsize = "compact"
+    else:
+        outputsize = "full"
+
+    url = f"{ALPHA_VANTAGE_URL}?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize={outputsize}&apikey={ALPHA_VANTAGE_KEY}"
+    try:
+        acquire("alphavantage")
+        response = get_session().get(url, timeout=REQUEST_TIMEOUT)
         data = response.json()
-        
-        if "Time Series (Daily)" in data:
-            time_series = data["Time Series (Daily)"]
-            dates = sorted(time_series.keys(), reverse=True)
-            
-            if len(dates) >= 2:
-                # Compare today vs yesterday (or days_ago)
-                today_close = float(time_series[dates[0]]["4. close"])
-                yesterday_close = float(time_series[dates[days_ago]]["4. close"])
-                
-                movement = "UP" if today_close > yesterday_close else "DOWN"
-                change = today_close - yesterday_close
-                change_percent = (change / yesterday_close) * 100
-                
-                return {
-                    "movement": movement,
-                    "today_close": today_close,
-                    "yesterday_close": yesterday_close,
-                    "change": change,
-                    "change_percent": change_percent,
-                    "dates": {"today": dates[0], "yesterday": dates[days_ago]}
-                }
-        
+    except Exception as e:
+        print(f"❌ Error fetching daily bars: {e}")
+        return None
+
+    if "Time Series (Daily)" not in data:
         print(f"⚠️  API response: {data}")
         return None
+
+    # Only settled sessions newer than what we have (today's partial bar is skipped)
+    settled = [
+        {
+            "date": day,
+            "open": float(bar["1. open"]),
+            "high": float(bar["2. high"]),
+            "low": float(bar["3. low"]),
+            "close": float(bar["4. close"]),
+            "volume": float(bar["5. volume"]),
+        }
+        for day, bar in data["Time Series (Daily)"].items()
+        if day <= expected and (final_through is None or day > final_through)
+    ]
+
+    # Collector snapshots newer than the last settled close are provisional:
+    # replace them with settled bars, but keep any session not settled yet on top
+    if settled:
+        newest = max(bar["date"] for bar in settled)
+        tail = market_store.load_bars(symbol, start=(datetime.fromisoformat(newest) + timedelta(days=1)).date(), root=root)
+        open_bars = [
+            {column: tail[column][i] for column in market_store.COLUMNS}
+            for i in range(len(tail["date"]))
+        ]
+        market_store.truncate_after(symbol, final_through, root=root)
+        market_store.append_bars(symbol, settled + open_bars, root=root)
+        final_through = newest
+
+    # Alpha Vantage may not have published the latest close yet (e.g. right
+    # after 16:00): only mark it checked once it has actually arrived
+    checked_through = expected if expected in data["Time Series (Daily)"] else state.get("checked_through")
+    save_sync_state(symbol, {"final_through": final_through, "checked_through": checked_through}, root)
+    return len(settled)
+
+def fetch_market_movement(days_ago=1, symbol=STOCK_SYMBOL):
+    """Whether the market went UP or DOWN from X sessions ago to the latest close"""
+    try:
+        sync_daily_bars(symbol)
+
+        final_through = load_sync_state(symbol).get("final_through")
+        if not final_through:
+            return None
+
+        # Settled closes are date-ordered on disk: index from the end, no sorting
+        bars = market_store.load_bars(symbol, end=final_through)
+        if len(bars["close"]) <= days_ago:
+            print(f"⚠️  Only {len(bars['close'])} settled bar(s) cached for {symbol}")
+            return None
+
+        today_close = float(bars["close"][-1])
+        yesterday_close = float(bars["close"][-1 - days_ago])
+        
+        movement = "UP" if today_close > yesterday_close else "DOWN"
+        change = today_close - yesterday_close
+        change_percent = (change / yesterday_close) * 100
+        
+        return {
+            "movement": movement,
+            "today_close": today_close,
+            "yesterday_close": yesterday_close,
+            "change": change,
+            "change_percent": change_percent,
+            "dates": {"today": str(bars["date"][-1]), "yesterday": str(bars["date"][-1 - days_ago])}
+        }
         
     except Exception as e:
         print(f"❌ Error fetching market movement: {e}")
         return None
 
-def load_reputation_scores():
-    """Load existing reputation scores"""
-    scores = {}
-    
-    if os.path.exists("reputation_scores.txt"):
-        try:
-            with open("reputation_scores.txt", "r") as f:
-                lines = f.readlines()
-                for line in lines:
-                    parts = line.strip().split(",")
-                    if len(parts) >= 3:
-                        agent = parts[0]
-                        correct = int(parts[1])
-                        total = int(parts[2])
-                        scores[agent] = {"correct": correct, "total": total}
-        except Exception as e:
-            print(f"⚠️  Error loading scores (starting fresh): {e}")
-    
-    return scores
+def load_close_index(symbol=STOCK_SYMBOL, root=market_store.STORE_DIR):
+    """Sorted settled session dates and closes for one symbol"""
+    final_through = load_sync_state(symbol, root).get("final_through")
+    if not final_through:
+        return None
+    bars = market_store.load_bars(symbol, end=final_through, root=root)
+    return {"date": bars["date"], "close": np.asarray(bars["close"])}
 
-def save_reputation_scores(scores):
-    """Save reputation scores to file"""
-    try:
-        with open("reputation_scores.txt", "w") as f:
-            for agent, stats in scores.items():
-                correct = stats["correct"]
-                total = stats["total"]
-                percentage = (correct / total * 100) if total > 0 else 0
-                f.write(f"{agent},{correct},{total},{percentage:.1f}%\n")
-        print("💾 Reputation scores saved!")
-    except Exception as e:
-        print(f"❌ Error saving scores: {e}")
+def resolve_outcomes(index, predictions):
+    """Next-session outcome for each prediction, via binary search over the close index.
 
-def verify_predictions(predictions, actual_movement):
-    """Verify predictions against actual market movement"""
+    The target is the first session that opened after the prediction (see
+    earliest_session), compared with the close before it - the last close
+    the prediction could have seen in full. Returns one entry per prediction:
+    an outcome dict, "pending" when that session has not settled yet, or None
+    when history starts too late to tell.
+    """
+    days = np.array([earliest_session(p["timestamp"]) for p in predictions], dtype="datetime64[D]")
+    positions = np.searchsorted(index["date"], days, side="left")
+    outcomes = []
+    for pos in positions.tolist():
+        if pos >= len(index["date"]):
+            outcomes.append("pending")
+        elif pos == 0:
+            outcomes.append(None)
+        else:
+            close, previous = float(index["close"][pos]), float(index["close"][pos - 1])
+            outcomes.append({
+                "movement": "UP" if close > previous else "DOWN",
+                "session": str(index["date"][pos]),
+                "close": close,
+                "previous_close": previous,
+            })
+    return outcomes
+
+def verify_predictions(predictions, outcomes, verbose=None):
+    """Verify each prediction against its own next-session outcome and record it"""
     print("\n🔍 Verifying Predictions...")
     print("=" * 60)
     
-    scores = load_reputation_scores()
+    if verbose is None:
+        verbose = len(predictions) <= VERBOSE_LIMIT
     
-    for pred in predictions:
-        agent = pred["agent"]
-        predicted = pred["prediction"]
-        actual = actual_movement["movement"]
-        
-        # Initialize agent if not in scores
-        if agent not in scores:
-            scores[agent] = {"correct": 0, "total": 0}
-        
-        # Check if prediction was correct
-        is_correct = (predicted == actual)
-        
-        # Update scores
-        scores[agent]["total"] += 1
-        if is_correct:
-            scores[agent]["correct"] += 1
+    for pred, outcome in zip(predictions, outcomes):
+        if not verbose:
+            break
+        is_correct = (pred["prediction"] == outcome["movement"])
         
         # Display result
         result_emoji = "✅" if is_correct else "❌"
-        print(f"{result_emoji} {agent}:")
-        print(f"   Predicted: {predicted} (Confidence: {pred['confidence']})")
-        print(f"   Actual: {actual}")
+        print(f"{result_emoji} {pred['agent']} ({pred['symbol']}, made {pred['timestamp'][:16]}):")
+        print(f"   Predicted: {pred['prediction']} (Confidence: {pred['confidence']})")
+        print(f"   Actual: {outcome['movement']} on {outcome['session']} (${outcome['previous_close']:.2f} → ${outcome['close']:.2f})")
         print(f"   Result: {'CORRECT' if is_correct else 'WRONG'}")
-        print(f"   Score: {scores[agent]['correct']}/{scores[agent]['total']} ({scores[agent]['correct']/scores[agent]['total']*100:.1f}%)")
         print()
     
-    return scores
+    # Outcomes and aggregates are written in one transaction; already-scored predictions are ignored
+    recorded = reputation_store.record_outcomes(list(zip(predictions, outcomes)))
+    print(f"   Recorded {recorded}/{len(predictions)} outcome(s)")
+    return recorded
 
 def run_scorekeeper():
     """Run the scorekeeper agent"""
     print("🤖 Stock Oracle - Scorekeeper Agent")
     print("=" * 60)
     
-    # Read predictions
-    print("\n📖 Reading predictions...")
-    predictions = read_predictions()
+    # Only predictions appended since the last run, plus those still waiting to mature
+    print("\n📖 Reading new predictions...")
+    state = load_score_state()
+    new_predictions = read_new_predictions(state)
+    candidates = latest_per_session(state["pending"] + new_predictions)
+    superseded = len(state["pending"]) + len(new_predictions) - len(candidates)
+    print(f"✅ {len(new_predictions)} new, {len(state['pending'])} carried over, {superseded} superseded")
     
-    if not predictions:
-        print("❌ No predictions to verify!")
+    if not candidates:
+        save_score_state(state)
+        print("✅ Nothing to score")
         return
     
-    print(f"✅ Found {len(predictions)} prediction(s)")
+    by_symbol = {}
+    for pred in candidates:
+        by_symbol.setdefault(pred["symbol"], []).append(pred)
     
-    # Fetch actual market movement
-    print("\n📊 Fetching actual market movement...")
-    actual_movement = fetch_market_movement(days_ago=1)
-    
-    if not actual_movement:
-        print("❌ Failed to fetch market data!")
-        print("\n⚠️  NOTE: For testing, we'll simulate market movement")
-        print("   In production, this would use real historical data")
+    pending = []
+    scored = 0
+    for symbol, symbol_predictions in by_symbol.items():
+        # Bring settled closes up to date, then resolve every prediction locally
+        print(f"\n📊 Resolving {len(symbol_predictions)} prediction(s) for {symbol}...")
+        try:
+            sync_daily_bars(symbol)
+            index = load_close_index(symbol)
+        except Exception as e:
+            print(f"❌ Error loading closes: {e}")
+            index = None
         
-        # SIMULATION for testing (remove this in production)
-        actual_movement = {
-            "movement": "DOWN",  # Simulated - change this to test
-            "today_close": 693.77,
-            "yesterday_close": 695.16,
-            "change": -1.39,
-            "change_percent": -0.20,
-            "dates": {"today": "2026-01-14", "yesterday": "2026-01-13"}
-        }
-        print(f"\n🎭 SIMULATION MODE:")
-    
-    print(f"✅ Market Movement: {actual_movement['movement']}")
-    print(f"   {actual_movement['dates']['yesterday']}: ${actual_movement['yesterday_close']}")
-    print(f"   {actual_movement['dates']['today']}: ${actual_movement['today_close']}")
-    print(f"   Change: {actual_movement['change']:.2f} ({actual_movement['change_percent']:.2f}%)")
+        if index is None or not len(index["date"]):
+            print("❌ No settled closes available! Keeping these predictions for the next run")
+            pending.extend(symbol_predictions)
+            continue
+        
+        outcomes = resolve_outcomes(index, symbol_predictions)
+        matured = [(p, o) for p, o in zip(symbol_predictions, outcomes) if isinstance(o, dict)]
+        waiting = [p for p, o in zip(symbol_predictions, outcomes) if o == "pending"]
+        unresolvable = len(symbol_predictions) - len(matured) - len(waiting)
+        pending.extend(waiting)
+        if unresolvable:
+            print(f"⚠️  {unresolvable} prediction(s) predate the cached history; skipped")
+        if not matured:
+            print(f"⏳ {len(waiting)} prediction(s) not matured yet")
+            continue
+        
+        # Verify and update scores
+        scored += verify_predictions([p for p, _ in matured], [o for _, o in matured])
     
-    # Verify and update scores
-    scores = verify_predictions(predictions, actual_movement)
-    save_reputation_scores(scores)
+    state["pending"] = pending
+    save_score_state(state)
+    print(f"\n📌 Scored {scored} prediction(s), {len(pending)} waiting to mature")
     
     print("\n" + "=" * 60)
     print("📊 FINAL REPUTATION SCORES:")
     print("=" * 60)
-    for agent, stats in scores.items():
+    for agent, stats in reputation_store.leaderboard().items():
         percentage = (stats['correct'] / stats['total'] * 100) if stats['total'] > 0 else 0
         print(f"{agent}: {stats['correct']}/{stats['total']} ({percentage:.1f}%)")
+        recent = reputation_store.recent_metrics(agent)
+        if recent:
+            print(f"   {format_metrics(recent)}")
     
     print("\n✅ SCOREKEEPER COMPLETE!")
 
@@ -1,60 +1,47 @@
 # sentiment_analyst.py — AI-driven news sentiment analyst
-from groq import Groq
 from datetime import datetime
-from config import GROQ_API_KEY, NEWS_API_KEY
-import requests
+import config
+from config import STOCK_SYMBOL
+import market_store
+import relevance_cache
+import news_archive
+import prediction_log
+import sentiment_lexicon
+import headline_clustering
+from llm_cache import cache_report
+from streaming import STREAM_MODE, stream_prediction, stream_prediction_async, announce_verdict, timing_report
+from llm_client import MODEL, MAX_IN_FLIGHT, chat_completion, chat_completion_async, gather_limited
+import asyncio
 import json
 
-MODEL = "llama-3.3-70b-versatile"
+# "llm" (default): LLM relevance selection, then LLM prediction | "hybrid": lexicon
+# keeps the top-k headlines, one LLM prediction | "local": lexicon verdict, never call Groq
+SENTIMENT_MODE = getattr(config, "SENTIMENT_MODE", "llm")
+TOP_K_HEADLINES = getattr(config, "SENTIMENT_TOP_K", 8)
 
 
 # -------------------------------------------------------------------
 # Fetch RAW headlines (intentionally broad)
 # -------------------------------------------------------------------
-def fetch_news_headlines():
+def fetch_news_headlines(limit=15):
+    """Pull anything new into the local archive, then read the newest headlines from it"""
     try:
-        url = (
-            "https://newsapi.org/v2/everything?"
-            "q=market OR stocks OR economy OR Wall Street OR SPY OR S&P 500&"
-            "language=en&sortBy=publishedAt&pageSize=15&"
-            f"apiKey={NEWS_API_KEY}"
-        )
-
-        r = requests.get(url, timeout=10)
-        data = r.json()
-
-        if data.get("status") == "ok":
-            return [
-                article.get("title", "")
-                for article in data.get("articles", [])
-                if article.get("title")
-            ]
-
+        news_archive.poll_news()
     except Exception as e:
-        print(f"⚠️ NewsAPI error: {e}")
+        print(f"⚠️ News archive error: {e}")
 
-    # Safe fallback
-    return [
-        "US stock futures trade cautiously ahead of economic data",
-        "Wall Street investors assess Federal Reserve policy outlook",
-        "Markets show mixed momentum amid inflation uncertainty",
-        "Equities remain range-bound as traders await earnings guidance"
-    ]
+    headlines = news_archive.recent_headlines(limit)
+    if not headlines:
+        print("⚠️ No archived headlines yet")
+    return headlines
 
 
 # -------------------------------------------------------------------
 # Read market data
 # -------------------------------------------------------------------
-def read_market_data():
+def read_market_data(symbol=STOCK_SYMBOL):
     try:
-        with open("latest_market_data.txt", "r") as f:
-            lines = f.readlines()
-            symbol, price, change = lines[1].strip().split(",")
-            return {
-                "symbol": symbol,
-                "price": float(price),
-                "change_percent": change
-            }
+        return market_store.read_market_data(symbol)
     except Exception as e:
         print(f"❌ Market data error: {e}")
         return None
@@ -63,70 +50,108 @@ def read_market_data():
 # -------------------------------------------------------------------
 # AI Tool: Select relevant headlines
 # -------------------------------------------------------------------
-def select_relevant_headlines(client, headlines):
-    tools = [
-        {
-            "type": "function",
-            "function": {
-                "name": "select_relevant_headlines",
-                "description": "Select only US stock-market relevant headlines",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "headlines": {
-                            "type": "array",
-                            "items": {"type": "string"}
-                        }
-                    },
-                    "required": ["headlines"]
-                }
+RELEVANCE_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "select_relevant_headlines",
+            "description": "Select only US stock-market relevant headlines",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "indices": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "description": "Numbers of the relevant headlines, as listed"
+                    }
+                },
+                "required": ["indices"]
             }
         }
-    ]
+    }
+]
+
+RELEVANCE_PROMPT = (
+    "You are a professional financial news editor.\n"
+    "From the provided headlines, select ONLY those relevant to:\n"
+    "- US stock market\n"
+    "- SPY / S&P 500\n"
+    "- Federal Reserve, inflation, interest rates\n"
+    "- Market sentiment or earnings\n\n"
+    "Headlines are numbered; return the numbers of the relevant ones. "
+    "If none are relevant, return an empty list."
+)
+
+
+def ask_relevant_headlines(headlines):
+    """One LLM tool call over the given headlines (no per-headline cache).
+
+    Returns the 0-based indices of the relevant headlines, or None when the
+    call failed or its answer could not be used.
+    """
+    try:
+        completion = chat_completion(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": RELEVANCE_PROMPT},
+                {"role": "user", "content": "\n".join(f"{i}. {h}" for i, h in enumerate(headlines, 1))}
+            ],
+            tools=RELEVANCE_TOOLS,
+            tool_choice={"type": "function", "function": {"name": "select_relevant_headlines"}},
+            temperature=0
+        )
+        tool_call = completion.choices[0].message.tool_calls
+        if not tool_call:
+            print("⚠️  Relevance: no tool call in the response")
+            return None
+        indices = json.loads(tool_call[0].function.arguments)["indices"]
+        return sorted({int(i) - 1 for i in indices if 1 <= int(i) <= len(headlines)})
+    except Exception as e:
+        print(f"⚠️  Relevance selection failed: {e}")
+        return None
 
-    system_prompt = (
-        "You are a professional financial news editor.\n"
-        "From the provided headlines, select ONLY those relevant to:\n"
-        "- US stock market\n"
-        "- SPY / S&P 500\n"
-        "- Federal Reserve, inflation, interest rates\n"
-        "- Market sentiment or earnings\n\n"
-        "If none are relevant, return an empty list."
-    )
 
-    completion = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": "\n".join(headlines)}
-        ],
-        tools=tools,
-        tool_choice="auto",
-        temperature=0
-    )
+def select_relevant_headlines(headlines):
+    """Relevant headlines, in input order; only never-seen titles go to the LLM.
+
+    Decisions are cached only when the LLM call succeeded; otherwise the new
+    titles are filtered by the lexicon for this run and asked about again next time.
+    """
+    criteria = relevance_cache.criteria_hash(RELEVANCE_PROMPT)
+    known = relevance_cache.lookup(criteria, headlines)
 
-    tool_call = completion.choices[0].message.tool_calls
-    if not tool_call:
-        return []
+    new_headlines = []
+    seen = set(known)
+    for h in headlines:
+        key = relevance_cache.title_hash(h)
+        if key not in seen:
+            seen.add(key)
+            new_headlines.append(h)
 
-    args = json.loads(tool_call[0].function.arguments)
-    return args.get("headlines", [])
+    if new_headlines:
+        selected = ask_relevant_headlines(new_headlines)
+        if selected is None:
+            _, relevance = sentiment_lexicon.score_headlines(new_headlines)
+            decisions = {h: bool(r >= 0.5) for h, r in zip(new_headlines, relevance)}
+        else:
+            chosen = set(selected)
+            decisions = {h: i in chosen for i, h in enumerate(new_headlines)}
+            relevance_cache.record(criteria, decisions)
+        known.update((relevance_cache.title_hash(h), keep) for h, keep in decisions.items())
+
+    print(f"🗂️  Relevance: {len(headlines) - len(new_headlines)} cached, {len(new_headlines)} sent to the LLM")
+    return [h for h in headlines if known.get(relevance_cache.title_hash(h))]
 
 
 # -------------------------------------------------------------------
 # AI Sentiment Prediction
 # -------------------------------------------------------------------
-def make_prediction(market_data, headlines):
-    client = Groq(api_key=GROQ_API_KEY)
-
-    relevant_headlines = select_relevant_headlines(client, headlines)
-
-    if not relevant_headlines:
-        relevant_headlines = [
-            "No materially market-moving news detected in the latest cycle"
-        ]
-
-    headlines_text = "\n".join(f"- {h}" for h in relevant_headlines)
+def build_messages(market_data, relevant_headlines, counts=None):
+    counts = counts or {}
+    headlines_text = "\n".join(
+        f"- {h} (reported by {counts[h]} outlets)" if counts.get(h, 1) > 1 else f"- {h}"
+        for h in relevant_headlines
+    )
 
     prompt = f"""
 You are a professional market sentiment analyst.
@@ -147,23 +172,102 @@ CONFIDENCE: [HIGH or MEDIUM or LOW]
 REASONING: [One clear sentence]
 """
 
-    completion = client.chat.completions.create(
+    return [
+        {"role": "system", "content": "Follow format strictly. Be objective."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def relevant_or_placeholder(headlines, mode=SENTIMENT_MODE):
+    if mode == "llm":
+        relevant_headlines = select_relevant_headlines(headlines)
+        label = "AI-SELECTED"
+    else:
+        relevant_headlines = sentiment_lexicon.rank_headlines(headlines, TOP_K_HEADLINES)
+        label = f"LEXICON TOP-{TOP_K_HEADLINES}"
+
+    if not relevant_headlines:
+        relevant_headlines = [
+            "No materially market-moving news detected in the latest cycle"
+        ]
+
+    print(f"\n📰 {label} RELEVANT HEADLINES:")
+    for h in relevant_headlines:
+        print(f"  • {h}")
+
+    return relevant_headlines
+
+
+def collapse_stories(headlines):
+    """Near-duplicate rewrites → one representative per story, with outlet counts"""
+    stories, counts = headline_clustering.collapse(headlines)
+    print(f"🧩 {len(headlines)} headline(s) → {len(stories)} distinct stories")
+    return stories, counts
+
+
+def make_prediction(market_data, headlines, mode=SENTIMENT_MODE):
+    stories, counts = collapse_stories(headlines)
+    if mode == "local":
+        return sentiment_lexicon.local_verdict(stories)
+
+    relevant_headlines = relevant_or_placeholder(stories, mode)
+
+    request = dict(
         model=MODEL,
-        messages=[
-            {"role": "system", "content": "Follow format strictly. Be objective."},
-            {"role": "user", "content": prompt}
-        ],
+        messages=build_messages(market_data, relevant_headlines, counts),
         temperature=0.4,
         max_tokens=120
     )
 
-    print("\n📰 AI-SELECTED RELEVANT HEADLINES:")
-    for h in relevant_headlines:
-        print(f"  • {h}")
+    if STREAM_MODE != "off":
+        text, _ = stream_prediction(
+            stop_early=(STREAM_MODE == "early_stop"),
+            on_verdict=announce_verdict,
+            **request
+        )
+        return text
+
+    completion = chat_completion(**request)
+    return completion.choices[0].message.content
+
 
+async def make_prediction_async(market_data, relevant_headlines, counts=None):
+    request = dict(
+        model=MODEL,
+        messages=build_messages(market_data, relevant_headlines, counts),
+        temperature=0.4,
+        max_tokens=120
+    )
+    if STREAM_MODE != "off":
+        text, _ = await stream_prediction_async(stop_early=(STREAM_MODE == "early_stop"), **request)
+        return text
+    completion = await chat_completion_async(**request)
     return completion.choices[0].message.content
 
 
+async def predict_many(symbols, headlines, max_in_flight=MAX_IN_FLIGHT, mode=SENTIMENT_MODE):
+    """Select headlines once, then predict every symbol concurrently"""
+    market = await asyncio.to_thread(lambda: {s: read_market_data(s) for s in symbols})
+    symbols = [s for s in symbols if market[s]]
+    stories, counts = await asyncio.to_thread(collapse_stories, headlines)
+    if mode == "local":
+        verdict = sentiment_lexicon.local_verdict(stories)
+        return {s: verdict for s in symbols}
+    relevant_headlines = await asyncio.to_thread(relevant_or_placeholder, stories, mode)
+
+    results = await gather_limited(
+        (make_prediction_async(market[s], relevant_headlines, counts) for s in symbols),
+        limit=max_in_flight,
+    )
+    responses = {}
+    for symbol, result in zip(symbols, results):
+        if isinstance(result, Exception):
+            print(f"❌ Groq API error for {symbol}: {result}")
+            result = None
+        responses[symbol] = result
+    return responses
+
+
 # -------------------------------------------------------------------
 # Parse response
 # -------------------------------------------------------------------
@@ -182,14 +286,32 @@ def parse_prediction(text):
 # -------------------------------------------------------------------
 # Save output
 # -------------------------------------------------------------------
-def save_prediction(data):
-    timestamp = datetime.now().isoformat()
-    line = (
-        f"SentimentAnalyst,{data['prediction']},"
-        f"{data['confidence']},{data['reasoning']},{timestamp}\n"
-    )
-    with open("predictions.txt", "a") as f:
-        f.write(line)
+def prediction_record(data, symbol=STOCK_SYMBOL):
+    return {
+        "agent": "SentimentAnalyst",
+        "prediction": data["prediction"],
+        "confidence": data["confidence"],
+        "reasoning": data["reasoning"],
+        "timestamp": datetime.now().isoformat(),
+        "symbol": symbol,
+    }
+
+
+def save_prediction(data, symbol=STOCK_SYMBOL):
+    prediction_log.append([prediction_record(data, symbol)])
+
+
+def save_predictions(responses):
+    """Parse and save every usable {symbol: response text} in one log append; returns how many were saved"""
+    records = []
+    for symbol, response in responses.items():
+        parsed = parse_prediction(response) if response else {}
+        if {"prediction", "confidence", "reasoning"} <= parsed.keys():
+            records.append(prediction_record(parsed, symbol))
+            print(f"  {symbol}: {parsed['prediction']} ({parsed['confidence']})")
+        else:
+            print(f"  {symbol}: ❌ no usable prediction")
+    return prediction_log.append(records)
 
 
 # -------------------------------------------------------------------
@@ -204,15 +326,35 @@ def run_sentiment_analyst():
         return
 
     headlines = fetch_news_headlines()
+    score, used = sentiment_lexicon.aggregate_sentiment(headline_clustering.collapse(headlines)[0])
+    print(f"🔤 Lexicon sentiment: {score:+.2f} over {used} relevant story(ies) ({SENTIMENT_MODE} mode)")
 
     response = make_prediction(market_data, headlines)
     print("\n📊 AI RESPONSE:\n", response)
 
     parsed = parse_prediction(response)
-    save_prediction(parsed)
+    save_prediction(parsed, market_data["symbol"])
 
+    print(cache_report())
+    if STREAM_MODE != "off":
+        print(timing_report())
     print("\n✅ SENTIMENT ANALYSIS COMPLETE")
 
 
+def run_sentiment_analyst_batch(symbols, max_in_flight=MAX_IN_FLIGHT):
+    print(f"🤖 Stock Oracle — Sentiment Analyst ({len(symbols)} symbols, {max_in_flight} in flight)")
+    print("=" * 60)
+
+    headlines = fetch_news_headlines()
+    started = datetime.now()
+    responses = asyncio.run(predict_many(symbols, headlines, max_in_flight))
+    elapsed = (datetime.now() - started).total_seconds()
+
+    saved = save_predictions(responses)
+    print(f"\n✅ Saved {saved}/{len(symbols)} prediction(s) in {elapsed:.2f}s")
+    print(cache_report())
+    return responses
+
+
 if __name__ == "__main__":
     run_sentiment_analyst()
@@ -0,0 +1,150 @@
+# sentiment_lexicon.py - In-process finance lexicon scorer for headlines
+#
+# Headlines are tokenized into one (headlines x vocabulary) count matrix;
+# sentiment and market relevance are then two matrix-vector products against
+# the lexicon weights. Used to rank/filter headlines before the LLM sees them
+# and, in "local" mode, to produce the sentiment verdict without any LLM call.
+import math
+import re
+import numpy as np
+
+# Term -> sentiment weight (positive = bullish). Loosely after finance-specific
+# word lists. Plain terms match as whole words plus their regular inflections
+# ("jump" → jumps/jumped/jumping); only terms ending in "*" are prefix stems,
+# so "rall*" covers rally/rallies/rallied without "eas" catching "easter".
+SENTIMENT_TERMS = {
+    "surg*": 1.0, "soar": 1.0, "rall*": 1.0, "jump": 0.8, "climb": 0.8, "gain": 0.7,
+    "rise": 0.6, "rose": 0.6, "rebound": 0.8, "record high": 1.0, "beat": 0.8,
+    "upgrad*": 0.8, "bull": 0.9, "bullish": 0.9, "strong": 0.6, "stronger": 0.6,
+    "optimis*": 0.7, "cool": 0.4, "ease": 0.4, "cut rates": 0.6,
+    "rate cut": 0.6, "boost": 0.7, "growth": 0.5, "profit": 0.4, "outperform*": 0.8,
+    "recover*": 0.7, "lift": 0.6, "cheer": 0.7,
+    "fall": -0.7, "fell": -0.7, "drop": -0.8, "dropped": -0.8, "slid": -0.8, "slide": -0.8,
+    "slump": -1.0, "plung*": -1.0, "tumbl*": -1.0, "sink": -0.9, "sank": -0.9,
+    "crash": -1.2, "sell-off": -1.0, "selloff": -1.0, "miss": -0.8, "downgrad*": -0.8,
+    "bear": -0.9, "bearish": -0.9, "weak": -0.7, "weaken": -0.7, "weakness": -0.7,
+    "fear": -0.8, "recession*": -1.0, "inflation*": -0.4,
+    "hike": -0.5, "higher for longer": -0.6, "tension": -0.6, "tariff": -0.5,
+    "layoff": -0.7, "default": -0.9, "loss": -0.6, "warn": -0.7, "uncertain*": -0.5,
+    "volatil*": -0.4, "weigh": -0.5, "slip": -0.5, "slipped": -0.5, "concern": -0.5, "crisis": -1.0,
+}
+
+# Term -> market relevance weight (how much a headline is about US equities)
+RELEVANCE_TERMS = {
+    "s&p": 1.5, "spy": 1.5, "dow": 1.2, "nasdaq": 1.2, "wall street": 1.2,
+    "stock": 1.0, "equit*": 1.0, "market": 0.8, "shares": 0.8, "index": 0.6, "indices": 0.6,
+    "fed": 1.2, "federal reserve": 1.5, "rate": 0.7, "inflation*": 1.0, "cpi": 1.0,
+    "treasury": 0.8, "yield": 0.8, "earnings": 1.0, "guidance": 0.6, "jobs report": 1.0,
+    "payroll": 0.9, "gdp": 0.9, "recession*": 0.8, "investor": 0.7, "trader": 0.7,
+    "rall*": 0.4, "sell-off": 0.6, "selloff": 0.6, "futures": 0.8, "oil": 0.4, "tech": 0.4,
+}
+
+NEGATORS = {"not", "no", "never", "without", "fails", "failed"}
+_TOKEN = re.compile(r"[a-z0-9&$%][a-z0-9&$%\-']*")
+
+
+def _tokens(text):
+    return [t[:-2] if t.endswith("'s") else t for t in _TOKEN.findall(text.lower())]
+
+
+def _inflections(word):
+    """The word plus its regular -s/-es/-ed/-ing forms (short words and tickers: plural only)"""
+    if len(word) <= 3:
+        return {word, word + "s"}
+    forms = {word, word + "s", word + "es", word + "ed", word + "ing"}
+    if word.endswith("e"):
+        forms |= {word + "d", word[:-1] + "ing"}
+    if word.endswith("y") and word[-2:-1] not in "aeiou":
+        forms |= {word[:-1] + "ies", word[:-1] + "ied"}
+    return forms
+
+
+def _vocabulary():
+    terms = sorted(set(SENTIMENT_TERMS) | set(RELEVANCE_TERMS))
+    index = {term: i for i, term in enumerate(terms)}
+    sentiment = np.array([SENTIMENT_TERMS.get(t, 0.0) for t in terms])
+    relevance = np.array([RELEVANCE_TERMS.get(t, 0.0) for t in terms])
+    return terms, index, sentiment, relevance
+
+
+TERMS, TERM_INDEX, SENTIMENT_WEIGHTS, RELEVANCE_WEIGHTS = _vocabulary()
+_STEMS = [t for t in TERMS if t.endswith("*")]
+_PHRASES = [t for t in TERMS if " " in t]
+_WORDS = {}  # inflected form -> columns of the whole-word terms it matches
+for _term in TERMS:
+    if _term not in _PHRASES and _term not in _STEMS:
+        for _form in _inflections(_term):
+            _WORDS.setdefault(_form, []).append(TERM_INDEX[_term])
+_token_terms = {}  # token -> vocabulary columns it matches
+
+
+def _columns(token):
+    columns = _token_terms.get(token)
+    if columns is None:
+        columns = _WORDS.get(token, []) + [TERM_INDEX[t] for t in _STEMS if token.startswith(t[:-1])]
+        _token_terms[token] = columns
+    return columns
+
+
+def headline_matrix(headlines):
+    """(len(headlines) x vocabulary) matrix of signed term counts.
+
+    A term right after a negator ("not", "no", ...) counts -1, so sentiment
+    flips while relevance still registers through abs() in score_headlines.
+    """
+    matrix = np.zeros((len(headlines), len(TERMS)))
+    for row, headline in enumerate(headlines):
+        lowered = headline.lower()
+        tokens = _tokens(lowered)
+        for i, token in enumerate(tokens):
+            sign = -1.0 if i > 0 and tokens[i - 1] in NEGATORS else 1.0
+            for column in _columns(token):
+                matrix[row, column] += sign
+        for phrase in _PHRASES:
+            if phrase in lowered:
+                matrix[row, TERM_INDEX[phrase]] += lowered.count(phrase)
+    return matrix
+
+
+def score_headlines(headlines):
+    """Per-headline (sentiment, relevance) arrays; sentiment roughly in [-1, 1]"""
+    if not headlines:
+        return np.zeros(0), np.zeros(0)
+    matrix = headline_matrix(headlines)
+    lengths = np.array([max(len(_tokens(h)), 1) for h in headlines], dtype=float)
+    sentiment = np.tanh(matrix @ SENTIMENT_WEIGHTS / np.sqrt(lengths) * 1.5)
+    relevance = np.abs(matrix) @ RELEVANCE_WEIGHTS
+    return sentiment, relevance
+
+
+def rank_headlines(headlines, top_k=8, min_relevance=0.5):
+    """The top_k market-relevant headlines, most informative first"""
+    sentiment, relevance = score_headlines(headlines)
+    if not len(headlines):
+        return []
+    priority = relevance * (1.0 + np.abs(sentiment))
+    order = np.argsort(-priority, kind="stable")
+    return [headlines[i] for i in order[:top_k] if relevance[i] >= min_relevance]
+
+
+def aggregate_sentiment(headlines):
+    """Relevance-weighted mean sentiment in [-1, 1] and the number of headlines used"""
+    sentiment, relevance = score_headlines(headlines)
+    mask = relevance > 0
+    if not mask.any():
+        return 0.0, 0
+    score = float(np.average(sentiment[mask], weights=relevance[mask]))
+    return score, int(mask.sum())
+
+
+def local_verdict(headlines):
+    """PREDICTION/CONFIDENCE/REASONING text from the lexicon alone"""
+    score, used = aggregate_sentiment(headlines)
+    direction = "UP" if score >= 0 else "DOWN"
+    strength = abs(score) * math.sqrt(min(used, 9) / 9)  # few headlines → less conviction
+    confidence = "HIGH" if strength >= 0.45 else "MEDIUM" if strength >= 0.2 else "LOW"
+    return (
+        f"PREDICTION: {direction}\n"
+        f"CONFIDENCE: {confidence}\n"
+        f"REASONING: Lexicon sentiment {score:+.2f} across {used} market-relevant headline(s)."
+    )
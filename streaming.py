@@ -0,0 +1,219 @@
+# streaming.py - Streamed chat completions that commit the verdict as soon as it lands
+#
+# PREDICTION and CONFIDENCE are parsed while tokens arrive. Once both are in,
+# the verdict is handed to an optional callback (time-to-first-prediction is
+# recorded), and the stream is either closed right away ("early_stop": the
+# REASONING line is never generated) or read to the end ("full").
+import asyncio
+import json
+import re
+import time
+from datetime import datetime
+import config
+import llm_cache
+from llm_client import get_client, get_async_client
+from rate_limiter import acquire, acquire_async
+
+# "off": plain completions | "early_stop": close the stream once the verdict is parsed
+# | "full": surface the verdict early but still read REASONING to the end
+STREAM_MODE = getattr(config, "STREAM_MODE", "off")
+TIMINGS_FILE = "llm_timings.jsonl"
+DEFERRED_REASONING = "Deferred (generation stopped once the verdict was parsed)"
+
+_PREDICTION = re.compile(r"PREDICTION:\s*\[?\s*(UP|DOWN)\b", re.IGNORECASE)
+_CONFIDENCE = re.compile(r"CONFIDENCE:\s*\[?\s*(HIGH|MEDIUM|LOW)\b", re.IGNORECASE)
+_REASONING = re.compile(r"REASONING:\s*(.+)")
+
+
+class VerdictStreamParser:
+    """Incrementally pulls PREDICTION/CONFIDENCE/REASONING out of streamed text"""
+
+    def __init__(self):
+        self.text = ""
+        self.prediction = None
+        self.confidence = None
+
+    def feed(self, chunk):
+        """Add a chunk; returns True once both decision fields are known"""
+        self.text += chunk
+        # Only match words that are complete, i.e. followed by more text
+        settled = self.text[:-1] if self.text and self.text[-1].isalpha() else self.text
+        if self.prediction is None:
+            match = _PREDICTION.search(settled)
+            if match:
+                self.prediction = match.group(1).upper()
+        if self.confidence is None:
+            match = _CONFIDENCE.search(settled)
+            if match:
+                self.confidence = match.group(1).upper()
+        return self.verdict_ready
+
+    def finish(self):
+        """Parse whatever is left once the stream has ended"""
+        if self.prediction is None or self.confidence is None:
+            self.feed("\n")
+
+    @property
+    def verdict_ready(self):
+        return self.prediction is not None and self.confidence is not None
+
+    def verdict(self):
+        result = {"prediction": self.prediction, "confidence": self.confidence}
+        match = _REASONING.search(self.text)
+        if match:
+            result["reasoning"] = match.group(1).strip()
+        return result
+
+
+def _record(model, started, first_token, first_prediction, stopped_early, path=TIMINGS_FILE):
+    """Append one timing record; returns it"""
+    finished = time.perf_counter()
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "model": model,
+        "ttft": None if first_token is None else round(first_token - started, 4),
+        "ttfp": None if first_prediction is None else round(first_prediction - started, 4),
+        "total": round(finished - started, 4),
+        "stopped_early": stopped_early,
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def _finalize(parser, stopped_early):
+    """Text in the usual three-line format, even when REASONING was cut off"""
+    if stopped_early:
+        return (f"PREDICTION: {parser.prediction}\n"
+                f"CONFIDENCE: {parser.confidence}\n"
+                f"REASONING: {DEFERRED_REASONING}")
+    return parser.text
+
+
+def _parse_all(text):
+    parser = VerdictStreamParser()
+    parser.feed(text)
+    parser.finish()
+    return parser.verdict()
+
+
+def _cached_text(kwargs):
+    cached = llm_cache.get(kwargs)
+    return cached.choices[0].message.content if cached is not None else None
+
+
+def _cache_text(kwargs, text):
+    llm_cache.put(kwargs, {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]})
+
+
+def announce_verdict(verdict):
+    """Default on_verdict callback: report the decision the moment it is parsed"""
+    print(f"⚡ Verdict streamed: {verdict['prediction']} ({verdict['confidence']})")
+
+
+def stream_prediction(stop_early=True, on_verdict=None, cache=True, **kwargs):
+    """Stream a PREDICTION/CONFIDENCE/REASONING completion.
+
+    Returns (text, timing). on_verdict(verdict_dict) fires the moment both
+    decision fields have been parsed.
+    """
+    if cache:
+        text = _cached_text(kwargs)
+        if text is not None:
+            if on_verdict:
+                on_verdict(_parse_all(text))
+            return text, {"cached": True}
+
+    acquire("groq")
+    started = time.perf_counter()
+    first_token = first_prediction = None
+    parser = VerdictStreamParser()
+    stopped_early = False
+
+    stream = get_client().chat.completions.create(stream=True, **kwargs)
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta and first_token is None:
+                first_token = time.perf_counter()
+            if parser.feed(delta) and first_prediction is None:
+                first_prediction = time.perf_counter()
+                if on_verdict:
+                    on_verdict(parser.verdict())
+                if stop_early:
+                    stopped_early = True
+                    break
+    finally:
+        stream.close()
+
+    parser.finish()
+    if first_prediction is None and parser.verdict_ready:
+        first_prediction = time.perf_counter()
+    text = _finalize(parser, stopped_early)
+    if cache and not stopped_early:
+        _cache_text(kwargs, text)
+    return text, _record(kwargs.get("model"), started, first_token, first_prediction, stopped_early)
+
+
+async def stream_prediction_async(stop_early=True, on_verdict=None, cache=True, **kwargs):
+    """Async variant of stream_prediction() on the loop's shared client"""
+    if cache:
+        text = await asyncio.to_thread(_cached_text, kwargs)
+        if text is not None:
+            if on_verdict:
+                on_verdict(_parse_all(text))
+            return text, {"cached": True}
+
+    await acquire_async("groq")
+    started = time.perf_counter()
+    first_token = first_prediction = None
+    parser = VerdictStreamParser()
+    stopped_early = False
+
+    stream = await get_async_client().chat.completions.create(stream=True, **kwargs)
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta and first_token is None:
+                first_token = time.perf_counter()
+            if parser.feed(delta) and first_prediction is None:
+                first_prediction = time.perf_counter()
+                if on_verdict:
+                    on_verdict(parser.verdict())
+                if stop_early:
+                    stopped_early = True
+                    break
+    finally:
+        await stream.close()
+
+    parser.finish()
+    if first_prediction is None and parser.verdict_ready:
+        first_prediction = time.perf_counter()
+    text = _finalize(parser, stopped_early)
+    if cache and not stopped_early:
+        await asyncio.to_thread(_cache_text, kwargs, text)
+    return text, _record(kwargs.get("model"), started, first_token, first_prediction, stopped_early)
+
+
+def timing_report(path=TIMINGS_FILE, last=100):
+    """Average time-to-first-token / first-prediction / total over recent streams"""
+    try:
+        with open(path, "r") as f:
+            records = [json.loads(line) for line in f.readlines()[-last:] if line.strip()]
+    except OSError:
+        return "⏱️  No streamed completions recorded yet"
+    if not records:
+        return "⏱️  No streamed completions recorded yet"
+
+    def average(field):
+        values = [r[field] for r in records if r.get(field) is not None]
+        return sum(values) / len(values) if values else float("nan")
+
+    early = sum(1 for r in records if r.get("stopped_early"))
+    return (f"⏱️  Streaming (last {len(records)}): first token {average('ttft'):.3f}s, "
+            f"first prediction {average('ttfp'):.3f}s, total {average('total'):.3f}s, "
+            f"{early} stopped early")
@@ -3,54 +3,57 @@
 
 DEBUG = True
 
-from groq import Groq
 from datetime import datetime
+import asyncio
+import json
+import config
 from config import GROQ_API_KEY, STOCK_SYMBOL
+import market_store
+from indicators import update_indicators, format_indicators
+import local_predictor
+import prediction_log
+from llm_cache import cache_report
+from streaming import STREAM_MODE, stream_prediction, stream_prediction_async, announce_verdict, timing_report
+from llm_client import MODEL, MAX_IN_FLIGHT, chat_completion, chat_completion_async, gather_limited
 import os
 
-def read_market_data():
-    """Read the latest market data"""
+# "llm": always ask Groq | "hybrid": local verdict when signals are decisive | "local": never call Groq
+PREDICTOR_MODE = getattr(config, "PREDICTOR_MODE", "hybrid")
+# Symbols packed into one structured-output request (1 = one request per symbol)
+BATCH_SIZE = getattr(config, "LLM_BATCH_SIZE", 20)
+
+def read_market_data(symbol=STOCK_SYMBOL):
+    """Read the latest market data from the OHLCV store"""
     try:
-        with open("latest_market_data.txt", "r") as f:
-            lines = f.readlines()
-            timestamp = lines[0].strip()
-            data_line = lines[1].strip()
-            symbol, price, change_percent = data_line.split(",")
-            return {
-                "symbol": symbol,
-                "price": float(price),
-                "change_percent": change_percent,
-                "timestamp": timestamp
-            }
+        return market_store.read_market_data(symbol)
     except Exception as e:
         print(f"❌ Error reading market data: {e}")
         return None
 
-def make_prediction(market_data):
-    """Use Groq to make a technical prediction"""
-
-    if DEBUG:
-        print("\n🔍 DEBUG: Starting make_prediction()")
-
-    if not GROQ_API_KEY or len(GROQ_API_KEY) < 10:
-        print("❌ DEBUG ERROR: GROQ_API_KEY is missing or invalid")
+def read_indicators(symbol=STOCK_SYMBOL):
+    """Indicator readings over the stored history (updated incrementally)"""
+    try:
+        return update_indicators([symbol]).get(symbol)
+    except Exception as e:
+        print(f"⚠️  Could not compute indicators: {e}")
         return None
 
-    if DEBUG:
-        print("✅ DEBUG: GROQ_API_KEY detected")
-        print(f"✅ DEBUG: Using model llama-3.3-70b-versatile")
-        print(f"✅ DEBUG: Market data sent → {market_data}")
+def build_messages(market_data, indicators=None):
+    """Chat messages for one symbol's technical prediction"""
+    indicator_block = ""
+    if indicators:
+        indicator_block = f"""
+Technical indicators (daily bars):
+{format_indicators(indicators)}
+"""
 
-    try:
-        client = Groq(api_key=GROQ_API_KEY)
-
-        prompt = f"""You are a technical analyst for stock market predictions.
+    prompt = f"""You are a technical analyst for stock market predictions.
 
 Based on this current market data:
 - Stock: {market_data['symbol']}
 - Current Price: ${market_data['price']}
 - Today's Change: {market_data['change_percent']}
-
+{indicator_block}
 Using technical analysis principles, predict: Will {market_data['symbol']} go UP or DOWN by market open tomorrow?
 
 Respond in this EXACT format (no extra text):
@@ -58,19 +61,49 @@ PREDICTION: [UP or DOWN]
 CONFIDENCE: [HIGH or MEDIUM or LOW]
 REASONING: [One sentence explaining your technical analysis]"""
 
+    return [
+        {"role": "system", "content": "You are a technical stock analyst. Be concise and follow the exact format requested."},
+        {"role": "user", "content": prompt}
+    ]
+
+def make_prediction(market_data, indicators=None):
+    """Use Groq to make a technical prediction"""
+
+    if DEBUG:
+        print("\n🔍 DEBUG: Starting make_prediction()")
+
+    if not GROQ_API_KEY or len(GROQ_API_KEY) < 10:
+        print("❌ DEBUG ERROR: GROQ_API_KEY is missing or invalid")
+        return None
+
+    if DEBUG:
+        print("✅ DEBUG: GROQ_API_KEY detected")
+        print(f"✅ DEBUG: Using model {MODEL}")
+        print(f"✅ DEBUG: Market data sent → {market_data}")
+
+    try:
         if DEBUG:
             print("📤 DEBUG: Sending request to Groq...")
 
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a technical stock analyst. Be concise and follow the exact format requested."},
-                {"role": "user", "content": prompt}
-            ],
+        request = dict(
+            model=MODEL,
+            messages=build_messages(market_data, indicators),
             temperature=0.7,
             max_tokens=150
         )
 
+        if STREAM_MODE != "off":
+            text, timing = stream_prediction(
+                stop_early=(STREAM_MODE == "early_stop"),
+                on_verdict=announce_verdict,
+                **request
+            )
+            if DEBUG and timing.get("ttfp") is not None:
+                print(f"📥 DEBUG: Verdict after {timing['ttfp']:.3f}s (stream total {timing['total']:.3f}s)")
+            return text
+
+        completion = chat_completion(**request)
+
         if DEBUG:
             print("📥 DEBUG: Received response from Groq")
 
@@ -87,6 +120,191 @@ REASONING: [One sentence explaining your technical analysis]"""
 
         return None
 
+async def make_prediction_async(market_data, indicators=None):
+    """Async variant of make_prediction() on the shared AsyncGroq client"""
+    request = dict(
+        model=MODEL,
+        messages=build_messages(market_data, indicators),
+        temperature=0.7,
+        max_tokens=150
+    )
+    if STREAM_MODE != "off":
+        text, _ = await stream_prediction_async(stop_early=(STREAM_MODE == "early_stop"), **request)
+        return text
+    completion = await chat_completion_async(**request)
+    return completion.choices[0].message.content
+
+
+def predict(market_data, indicators=None, mode=PREDICTOR_MODE):
+    """Pick the fast local path or the LLM; returns the response text"""
+    if mode != "llm":
+        response = local_predictor.predict(indicators, force=(mode == "local"))
+        if response:
+            if DEBUG:
+                print("⚡ DEBUG: Signals decisive, skipping the LLM")
+            local_predictor.record_decision(used_local=True)
+            return response
+        if mode == "local":
+            print("❌ No usable prediction (local mode, no indicators yet)")
+            return None
+
+    response = make_prediction(market_data, indicators)
+    if response:
+        local_predictor.record_decision(used_local=False)
+    return response
+
+
+def build_batch_request(items):
+    """One chat request covering many symbols, answered through a JSON-schema tool.
+
+    items: list of (market_data, indicators) pairs.
+    """
+    symbols = [market_data['symbol'] for market_data, _ in items]
+    sections = []
+    for market_data, indicators in items:
+        lines = [
+            f"### {market_data['symbol']}",
+            f"- Current Price: ${market_data['price']}",
+            f"- Today's Change: {market_data['change_percent']}",
+        ]
+        if indicators:
+            lines.append(format_indicators(indicators))
+        sections.append("\n".join(lines))
+
+    prompt = (
+        "You are a technical analyst for stock market predictions.\n\n"
+        "For EACH stock below, use technical analysis principles to predict whether it "
+        "will go UP or DOWN by market open tomorrow.\n\n"
+        + "\n\n".join(sections)
+        + "\n\nCall submit_predictions exactly once with one entry per stock."
+    )
+
+    tool = {
+        "type": "function",
+        "function": {
+            "name": "submit_predictions",
+            "description": "Submit one technical prediction per stock",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "predictions": {
+                        "type": "array",
+                        "minItems": len(symbols),
+                        "maxItems": len(symbols),
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "symbol": {"type": "string", "enum": symbols},
+                                "prediction": {"type": "string", "enum": ["UP", "DOWN"]},
+                                "confidence": {"type": "string", "enum": ["HIGH", "MEDIUM", "LOW"]},
+                                "reasoning": {"type": "string", "description": "One sentence of technical reasoning"}
+                            },
+                            "required": ["symbol", "prediction", "confidence", "reasoning"]
+                        }
+                    }
+                },
+                "required": ["predictions"]
+            }
+        }
+    }
+
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a technical stock analyst. Be concise and answer only through the tool."},
+            {"role": "user", "content": prompt}
+        ],
+        "tools": [tool],
+        "tool_choice": {"type": "function", "function": {"name": "submit_predictions"}},
+        "temperature": 0.7,
+        "max_tokens": 80 * len(symbols) + 50,
+    }
+
+def parse_batch_prediction(completion, symbols):
+    """Parse a submit_predictions tool call in one pass → {symbol: prediction_data}"""
+    message = completion.choices[0].message
+    if getattr(message, "tool_calls", None):
+        arguments = message.tool_calls[0].function.arguments
+    else:
+        arguments = message.content or "{}"  # some models answer with bare JSON
+
+    wanted = {s.upper(): s for s in symbols}
+    results = {}
+    for entry in json.loads(arguments).get("predictions", []):
+        symbol = wanted.get(str(entry.get("symbol", "")).upper())
+        prediction = str(entry.get("prediction", "")).upper()
+        confidence = str(entry.get("confidence", "")).upper()
+        if symbol and prediction in ("UP", "DOWN") and confidence in ("HIGH", "MEDIUM", "LOW"):
+            results[symbol] = {
+                "prediction": prediction,
+                "confidence": confidence,
+                "reasoning": str(entry.get("reasoning", "")).strip()
+            }
+    return results
+
+async def make_batch_prediction_async(items):
+    """Predict a batch of symbols with one structured-output request"""
+    completion = await chat_completion_async(**build_batch_request(items))
+    return parse_batch_prediction(completion, [market_data['symbol'] for market_data, _ in items])
+
+async def predict_many(symbols, mode=PREDICTOR_MODE, max_in_flight=MAX_IN_FLIGHT, batch_size=BATCH_SIZE):
+    """Predict many symbols at once: local fast path first, then concurrent LLM calls.
+
+    With batch_size > 1 the remaining symbols are packed batch_size per
+    request; otherwise each gets its own request. Returns
+    {symbol: prediction_data or None}.
+    """
+    # Store reads and the indicator state files are blocking I/O: keep them off the loop
+    market = await asyncio.to_thread(lambda: {s: read_market_data(s) for s in symbols})
+    symbols = [s for s in symbols if market[s]]
+    try:
+        indicators = await asyncio.to_thread(update_indicators, symbols)
+    except Exception as e:
+        print(f"⚠️  Could not compute indicators: {e}")
+        indicators = {}
+
+    predictions = {}
+    pending = []
+    for symbol in symbols:
+        local = None
+        if mode != "llm":
+            local = local_predictor.predict(indicators.get(symbol), force=(mode == "local"))
+        if local:
+            predictions[symbol] = parse_prediction(local)
+        elif mode == "local":
+            predictions[symbol] = None  # no indicators yet; local mode never calls the LLM
+        else:
+            pending.append(symbol)
+
+    if batch_size > 1:
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        results = await gather_limited(
+            (make_batch_prediction_async([(market[s], indicators.get(s)) for s in batch]) for batch in batches),
+            limit=max_in_flight,
+        )
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                print(f"❌ Groq API error for batch {batch[0]}..{batch[-1]}: {result}")
+                result = {}
+            for symbol in batch:
+                predictions[symbol] = result.get(symbol)
+    else:
+        results = await gather_limited(
+            (make_prediction_async(market[s], indicators.get(s)) for s in pending),
+            limit=max_in_flight,
+        )
+        for symbol, result in zip(pending, results):
+            if isinstance(result, Exception):
+                print(f"❌ Groq API error for {symbol}: {result}")
+                result = None
+            predictions[symbol] = parse_prediction(result) if result else None
+
+    local_predictor.record_counts(
+        local=sum(1 for s in symbols if s not in pending and predictions[s]),
+        llm=sum(1 for s in pending if predictions[s]),
+    )
+    return predictions
+
 
 def parse_prediction(response):
     """Parse the prediction response"""
@@ -103,18 +321,21 @@ def parse_prediction(response):
     
     return prediction_data
 
-def save_prediction(prediction_data):
-    """Save prediction to file"""
-    timestamp = datetime.now().isoformat()
-    
-    # Format: AGENT,PREDICTION,CONFIDENCE,REASONING,TIMESTAMP
-    line = f"TechnicalAnalyst,{prediction_data['prediction']},{prediction_data['confidence']},{prediction_data['reasoning']},{timestamp}\n"
-    
-    # Append to predictions file
-    with open("predictions.txt", "a") as f:
-        f.write(line)
-    
-    print(f"💾 Prediction saved to predictions.txt")
+def prediction_record(prediction_data, symbol=STOCK_SYMBOL):
+    """Prediction log record for a parsed prediction, stamped now"""
+    return {
+        "agent": "TechnicalAnalyst",
+        "prediction": prediction_data["prediction"],
+        "confidence": prediction_data["confidence"],
+        "reasoning": prediction_data["reasoning"],
+        "timestamp": datetime.now().isoformat(),
+        "symbol": symbol,
+    }
+
+def save_prediction(prediction_data, symbol=STOCK_SYMBOL):
+    """Append prediction to the prediction log"""
+    prediction_log.append([prediction_record(prediction_data, symbol)])
+    print(f"💾 Prediction saved to {prediction_log.LOG_FILE}")
 
 def run_technical_analyst():
     """Run the technical analyst agent"""
@@ -133,9 +354,13 @@ def run_technical_analyst():
     
     print(f"✅ Loaded: {market_data['symbol']} at ${market_data['price']} ({market_data['change_percent']})")
     
+    indicators = read_indicators(market_data['symbol'])
+    if indicators:
+        print(f"📈 Indicators over {indicators['bars']} bar(s):\n{format_indicators(indicators)}")
+    
     # Make prediction
-    print("\n🧠 Analyzing with AI...")
-    response = make_prediction(market_data)
+    print(f"\n🧠 Analyzing ({PREDICTOR_MODE} mode)...")
+    response = predict(market_data, indicators)
     
     if not response:
         print("❌ Failed to get prediction from Groq")
@@ -152,10 +377,41 @@ def run_technical_analyst():
         print(f"   Confidence: {prediction_data.get('confidence', 'N/A')}")
         print(f"   Reasoning: {prediction_data.get('reasoning', 'N/A')}")
         
-        save_prediction(prediction_data)
+        save_prediction(prediction_data, market_data['symbol'])
+        print(local_predictor.fast_path_report())
+        print(cache_report())
+        if STREAM_MODE != "off":
+            print(timing_report())
         print("\n✅ TECHNICAL ANALYST COMPLETE!")
     else:
         print("❌ Failed to parse prediction")
 
+def save_predictions(predictions):
+    """Save every complete {symbol: prediction_data} in one log append; returns how many were saved"""
+    records = []
+    for symbol, prediction_data in predictions.items():
+        prediction_data = prediction_data or {}
+        if {"prediction", "confidence", "reasoning"} <= prediction_data.keys():
+            records.append(prediction_record(prediction_data, symbol))
+            print(f"   {symbol}: {prediction_data['prediction']} ({prediction_data['confidence']})")
+        else:
+            print(f"   {symbol}: ❌ no usable prediction")
+    return prediction_log.append(records)
+
+def run_technical_analyst_batch(symbols, max_in_flight=MAX_IN_FLIGHT, batch_size=BATCH_SIZE):
+    """Analyze many symbols concurrently and save every parsed prediction"""
+    print(f"🤖 Stock Oracle - Technical Analyst ({len(symbols)} symbols, "
+          f"{batch_size} per request, {max_in_flight} in flight)")
+    print("=" * 60)
+    started = datetime.now()
+    predictions = asyncio.run(predict_many(symbols, max_in_flight=max_in_flight, batch_size=batch_size))
+    elapsed = (datetime.now() - started).total_seconds()
+
+    saved = save_predictions(predictions)
+    print(f"\n✅ Saved {saved}/{len(symbols)} prediction(s) in {elapsed:.2f}s")
+    print(local_predictor.fast_path_report())
+    print(cache_report())
+    return predictions
+
 if __name__ == "__main__":
     run_technical_analyst() 